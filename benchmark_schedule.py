@@ -0,0 +1,44 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from schedule_timeline import DEPENDENCY_MODES, schedule_timeline
+
+
+def synthetic_timeline(n_rows, n_phases=10, subtasks_per_task=5, seed=0):
+    """
+    Builds a random timeline of `n_rows` subtasks shaped like a large project portfolio.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.arange(n_rows)
+    days = rng.integers(1, 10, size=n_rows)
+    return pd.DataFrame({
+        'Phase': [f"Phase {phase}" for phase in rows * n_phases // n_rows],
+        'Task': [f"Task {task}" for task in rows // subtasks_per_task],
+        'Subtask': [f"Subtask {row}" for row in rows],
+        'Total Time (Days)': days,
+        'Total Time (Hours)': days * 8,
+    })
+
+
+def benchmark(n_rows, repeats=3):
+    df = synthetic_timeline(n_rows)
+    cases = [(mode, None) for mode in DEPENDENCY_MODES] + [("phases", 50)]
+    for mode, team_size in cases:
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            _, project_duration = schedule_timeline(df, start_date="2025-01-06", dependency_mode=mode, team_size=team_size)
+            timings.append(time.perf_counter() - started)
+        team = f"team of {team_size}" if team_size else "unlimited team"
+        print(f"{n_rows:>7} rows | {mode:<10} | {team:<14} | best {min(timings) * 1000:8.1f} ms | "
+              f"project {project_duration:,.0f} days")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the timeline schedule computation.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    for n_rows in args.rows:
+        benchmark(n_rows, repeats=args.repeats)
@@ -0,0 +1,329 @@
+import csv
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DB_PATH = os.getenv("DURATION_MEMORY_DB") or "duration_memory.db"
+DEFAULT_MATCH_THRESHOLD = float(os.getenv("DURATION_MATCH_THRESHOLD") or 0.85)
+NGRAM_SIZE = 3
+
+
+def normalize_text(text):
+    """
+    Normalizes a task or subtask description for matching.
+
+    Args:
+        text (str): The raw description.
+
+    Returns:
+        str: Lowercased text with punctuation removed and whitespace collapsed.
+    """
+    text = re.sub(r"[^a-z0-9]+", " ", (text or "").lower())
+    return " ".join(text.split())
+
+
+def match_key(task, subtask):
+    """
+    Builds the normalized text used to index a (task, subtask) pair.
+    A missing subtask ('-') is matched on the task alone.
+    """
+    subtask = normalize_text(subtask)
+    task = normalize_text(task)
+    return f"{task} | {subtask}" if subtask else task
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    padded = f" {text} "
+    if len(padded) <= n:
+        return Counter([padded])
+    return Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def parse_timeline_rows(timeline_text):
+    """
+    Parses the CSV part of a timeline response into rows.
+
+    Args:
+        timeline_text (str): Timeline text, optionally followed by the Developer Side Queries section.
+
+    Returns:
+        tuple: The header row and the list of data rows (each a list of stripped cells).
+    """
+    timeline_data = timeline_text.split("\n\n")[0]
+    reader = csv.reader(line for line in timeline_data.splitlines() if line.strip())
+    rows = [[cell.strip() for cell in row] for row in reader]
+    if not rows:
+        return [], []
+    return rows[0], [row for row in rows[1:] if len(row) >= 3]
+
+
+def _to_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number) or number <= 0:
+        return None
+    return number
+
+
+def format_duration(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+# Immutable view of the index that lookups score against without holding the lock.
+# Entry n-grams are stored CSR-style: the n-grams of entry i are gram_ids[indptr[i]:indptr[i + 1]].
+IndexSnapshot = namedtuple(
+    "IndexSnapshot", ["n_entries", "indptr", "gram_ids", "tf", "doc_freq", "idf", "norms", "days", "hours"]
+)
+
+
+class DurationMemory:
+    """
+    Local store of previously accepted subtask duration estimates.
+
+    Rows are persisted in SQLite and matched with a character n-gram TF-IDF index
+    held in memory, so similar subtasks can reuse past estimates without an LLM call.
+
+    The index is updated in place as estimates are remembered. A lookup only scores the
+    entries that share one of the query's rarest n-grams, chosen so that no entry outside
+    them can reach the threshold, and scores them with array operations outside the lock.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, threshold=DEFAULT_MATCH_THRESHOLD):
+        self.db_path = db_path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._vocab = {}  # n-gram -> gram id
+        self._postings = defaultdict(list)  # gram id -> ids of the entries containing it
+        self._entry_ids = {}  # match key -> entry id
+        self._snapshot = self._empty_snapshot()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS estimates ("
+                "key TEXT PRIMARY KEY, task TEXT, subtask TEXT, "
+                "days REAL, hours REAL, updated_at REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def remember(self, rows):
+        """
+        Stores accepted estimates, replacing older estimates for the same subtask.
+
+        Args:
+            rows (list): Rows of (phase, task, subtask, days, hours).
+
+        Returns:
+            int: The number of rows stored.
+        """
+        records = []
+        now = time.time()
+        for row in rows:
+            if len(row) < 5:
+                continue
+            days, hours = _to_number(row[3]), _to_number(row[4])
+            key = match_key(row[1], row[2])
+            if days is None or hours is None or not key:
+                continue
+            records.append((key, row[1], row[2], days, hours, now))
+
+        if not records:
+            return 0
+        with self._lock:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO estimates (key, task, subtask, days, hours, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    records,
+                )
+            if self._loaded:
+                self._add_entries([(key, days, hours) for key, _, _, days, hours, _ in records])
+        return len(records)
+
+    def remember_timeline(self, timeline_text):
+        """
+        Stores every estimate of an accepted timeline (Phase,Task,Subtask,Total Time (Days),Total Time (Hours)).
+        """
+        if not timeline_text:
+            return 0
+        _, rows = parse_timeline_rows(timeline_text)
+        return self.remember(rows)
+
+    @staticmethod
+    def _empty_snapshot():
+        empty = np.empty(0)
+        return IndexSnapshot(0, np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64), empty,
+                             np.empty(0, dtype=np.int64), empty, empty, empty, empty)
+
+    def _ensure_loaded(self):
+        # Called with the lock held; the stored estimates are read once, later ones are added incrementally
+        if self._loaded:
+            return
+        with self._connect() as conn:
+            entries = conn.execute("SELECT key, days, hours FROM estimates").fetchall()
+        self._loaded = True
+        self._add_entries(entries)
+
+    def _add_entries(self, entries):
+        """
+        Adds (key, days, hours) entries to the index, replacing the estimate of keys already in it.
+        Called with the lock held. A new snapshot is built, the previous one is left untouched.
+        """
+        snapshot = self._snapshot
+        days = snapshot.days.copy()
+        hours = snapshot.hours.copy()
+        new_days, new_hours, new_grams, new_tf = [], [], [], []
+        n_entries = snapshot.n_entries
+        for key, entry_days, entry_hours in entries:
+            entry_id = self._entry_ids.get(key)
+            if entry_id is not None:
+                # Same key means the same n-grams, only the estimate changes
+                if entry_id < len(days):
+                    days[entry_id], hours[entry_id] = entry_days, entry_hours
+                else:
+                    new_days[entry_id - len(days)], new_hours[entry_id - len(days)] = entry_days, entry_hours
+                continue
+            entry_id = n_entries
+            n_entries += 1
+            self._entry_ids[key] = entry_id
+            grams = char_ngrams(key)
+            gram_ids = [self._vocab.setdefault(gram, len(self._vocab)) for gram in grams]
+            for gram_id in gram_ids:
+                self._postings[gram_id].append(entry_id)
+            new_grams.append(gram_ids)
+            new_tf.append([1 + math.log(count) for count in grams.values()])
+            new_days.append(entry_days)
+            new_hours.append(entry_hours)
+        if n_entries == snapshot.n_entries:
+            self._snapshot = snapshot._replace(days=days, hours=hours)
+            return
+
+        lengths = np.array([len(gram_ids) for gram_ids in new_grams], dtype=np.int64)
+        indptr = np.concatenate([snapshot.indptr, snapshot.indptr[-1] + np.cumsum(lengths)])
+        gram_ids = np.concatenate([snapshot.gram_ids, np.fromiter((g for ids in new_grams for g in ids), dtype=np.int64)])
+        tf = np.concatenate([snapshot.tf, np.fromiter((t for values in new_tf for t in values), dtype=np.float64)])
+        doc_freq = np.bincount(gram_ids, minlength=len(self._vocab))
+
+        # Idf changes with every new entry, so entry norms are recomputed over the whole index at once
+        idf = np.log((1 + n_entries) / (1 + doc_freq)) + 1
+        entry_of_gram = np.repeat(np.arange(n_entries), np.diff(indptr))
+        weights = tf * idf[gram_ids]
+        norms = np.sqrt(np.bincount(entry_of_gram, weights=weights * weights, minlength=n_entries))
+        norms[norms == 0] = 1.0
+
+        self._snapshot = IndexSnapshot(
+            n_entries, indptr, gram_ids, tf, doc_freq, idf, norms,
+            np.concatenate([days, new_days]), np.concatenate([hours, new_hours]),
+        )
+
+    def _candidates(self, snapshot, query_grams, query_weights):
+        """
+        Returns the ids of the entries that can reach the threshold for a query.
+
+        The score of an entry is at most the norm of the query weights it shares, so every entry
+        at or above the threshold shares one of the query n-grams taken rarest first until the
+        weight left over is below the threshold. Only those n-grams' postings are read.
+        """
+        doc_freq = [snapshot.doc_freq[gram_id] if gram_id is not None and gram_id < len(snapshot.doc_freq) else 0
+                    for gram_id in query_grams]
+        remaining = float(np.dot(query_weights, query_weights))
+        min_shared = self.threshold * self.threshold
+        candidate_lists = []
+        for idx in np.argsort(doc_freq, kind="stable"):
+            if remaining < min_shared:
+                break
+            remaining -= query_weights[idx] * query_weights[idx]
+            gram_id = query_grams[idx]
+            if doc_freq[idx]:
+                candidate_lists.append(np.array(self._postings[gram_id], dtype=np.int64))
+        if not candidate_lists:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(candidate_lists))
+        # Postings may already hold entries added after this snapshot was taken
+        return candidates[candidates < snapshot.n_entries]
+
+    def _best_match(self, snapshot, key):
+        grams = char_ngrams(key)
+        query_grams = [self._vocab.get(gram) for gram in grams]
+        # Unknown n-grams get the highest idf so novel wording lowers the similarity
+        unknown_idf = math.log(1 + snapshot.n_entries) + 1
+        query_weights = np.array([
+            (1 + math.log(count)) * (snapshot.idf[gram_id] if gram_id is not None and gram_id < len(snapshot.idf) else unknown_idf)
+            for gram_id, count in zip(query_grams, grams.values())
+        ])
+        query_weights /= np.linalg.norm(query_weights) or 1.0
+
+        candidates = self._candidates(snapshot, query_grams, query_weights)
+        if not candidates.size:
+            return None
+
+        # Dot products of the query with every candidate over the candidates' CSR segments
+        query_dense = np.zeros(len(snapshot.idf))
+        for gram_id, weight in zip(query_grams, query_weights):
+            if gram_id is not None and gram_id < len(query_dense):
+                query_dense[gram_id] = weight * snapshot.idf[gram_id]
+        counts = snapshot.indptr[candidates + 1] - snapshot.indptr[candidates]
+        positions = np.repeat(snapshot.indptr[candidates] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        contributions = query_dense[snapshot.gram_ids[positions]] * snapshot.tf[positions]
+        scores = np.bincount(np.repeat(np.arange(len(candidates)), counts), weights=contributions,
+                             minlength=len(candidates)) / snapshot.norms[candidates]
+
+        best = int(np.argmax(scores))
+        return candidates[best], float(scores[best])
+
+    def lookup(self, task, subtask):
+        """
+        Finds the closest stored estimate for a subtask.
+
+        Returns:
+            tuple: (days, hours, score) for a confident match, otherwise None.
+        """
+        return self.lookup_many([("", task, subtask)])[0]
+
+    def lookup_many(self, rows):
+        """
+        Finds the closest stored estimate for each (phase, task, subtask) row.
+
+        Returns:
+            list: (days, hours, score) for rows with a confident match and None for the rest.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            snapshot = self._snapshot
+
+        results = []
+        for row in rows:
+            key = match_key(row[1], row[2])
+            match = self._best_match(snapshot, key) if key and snapshot.n_entries else None
+            if match is not None and match[1] >= self.threshold:
+                entry_id, score = match
+                results.append((float(snapshot.days[entry_id]), float(snapshot.hours[entry_id]), score))
+            else:
+                results.append(None)
+        return results
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_duration_memory():
+    """
+    Returns the process-wide DurationMemory shared by all sessions.
+    """
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = DurationMemory()
+        return _memory
@@ -0,0 +1,146 @@
+import hashlib
+import io
+import json
+import os
+from collections import OrderedDict, namedtuple
+from dotenv import load_dotenv
+from generate_excel import parse_gpt_timeline_response, build_timeline_workbook
+from schedule_timeline import schedule_timeline
+
+load_dotenv()
+
+EXPORT_CACHE_SIZE = int(os.getenv("EXPORT_CACHE_SIZE") or 8)
+
+ExportFormat = namedtuple("ExportFormat", ["label", "extension", "mime", "writer"])
+
+# Registered export formats, in the order they are offered for download
+EXPORT_FORMATS = OrderedDict()
+
+
+def register_export_format(name, label, extension, mime, writer):
+    """
+    Registers an export format.
+
+    Args:
+        name (str): The format key, e.g. 'csv'.
+        label (str): The label shown to users.
+        extension (str): The file extension without the dot.
+        mime (str): The MIME type of the exported file.
+        writer (callable): Called with (df, developer_queries_list) and returns the file's bytes.
+    """
+    EXPORT_FORMATS[name] = ExportFormat(label, extension, mime, writer)
+
+
+def write_csv(df, developer_queries_list):
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def write_json(df, developer_queries_list):
+    document = {
+        "timeline": json.loads(df.to_json(orient="records", date_format="iso")),
+        "developer_queries": developer_queries_list,
+    }
+    return json.dumps(document, indent=2).encode("utf-8")
+
+
+def write_parquet(df, developer_queries_list):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def write_xlsx(df, developer_queries_list):
+    buffer = io.BytesIO()
+    build_timeline_workbook(df, developer_queries_list).save(buffer)
+    return buffer.getvalue()
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+register_export_format("xlsx", "Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_xlsx)
+register_export_format("csv", "CSV", "csv", "text/csv", write_csv)
+register_export_format("json", "JSON", "json", "application/json", write_json)
+if parquet_available():
+    register_export_format("parquet", "Parquet", "parquet", "application/vnd.apache.parquet", write_parquet)
+
+
+def timeline_version_key(timeline_text):
+    """
+    Returns the cache key of a timeline version, a hash of its text.
+    """
+    return hashlib.sha1(timeline_text.encode("utf-8")).hexdigest()
+
+
+class TimelineExporter:
+    """
+    Per-session export cache over parsed timelines.
+
+    A timeline is parsed once per version and each format is only serialized when it is
+    requested, then cached for that version. The least recently used versions are dropped
+    once more than `max_versions` are cached.
+    """
+
+    def __init__(self, max_versions=EXPORT_CACHE_SIZE):
+        self.max_versions = max_versions
+        # version key -> {"parsed": (df, queries), "schedules": {options: (df, days)}, "exports": {(name, options): bytes}}
+        self._versions = OrderedDict()
+
+    def _entry(self, timeline_text):
+        key = timeline_version_key(timeline_text)
+        entry = self._versions.get(key)
+        if entry is None:
+            entry = {"parsed": parse_gpt_timeline_response(timeline_text), "schedules": {}, "exports": {}}
+            self._versions[key] = entry
+            while len(self._versions) > self.max_versions:
+                self._versions.popitem(last=False)
+        self._versions.move_to_end(key)
+        return entry
+
+    def parse(self, timeline_text):
+        """
+        Returns the timeline DataFrame and developer side queries of a timeline version.
+        """
+        return self._entry(timeline_text)["parsed"]
+
+    def schedule(self, timeline_text, schedule_options):
+        """
+        Returns the scheduled timeline and the project duration in working days.
+
+        Args:
+            timeline_text (str): The timeline version.
+            schedule_options (tuple): (start_date, dependency_mode, team_size) passed to schedule_timeline.
+        """
+        entry = self._entry(timeline_text)
+        if schedule_options not in entry["schedules"]:
+            start_date, dependency_mode, team_size = schedule_options
+            entry["schedules"][schedule_options] = schedule_timeline(
+                entry["parsed"][0], start_date=start_date, dependency_mode=dependency_mode, team_size=team_size
+            )
+        return entry["schedules"][schedule_options]
+
+    def is_exported(self, timeline_text, name, schedule_options=None):
+        entry = self._versions.get(timeline_version_key(timeline_text))
+        return entry is not None and (name, schedule_options) in entry["exports"]
+
+    def export(self, timeline_text, name, schedule_options=None):
+        """
+        Serializes a timeline version to a registered format, reusing the cached bytes if present.
+        With schedule options the export includes the schedule columns (and a Gantt sheet in Excel).
+
+        Returns:
+            bytes: The exported file content.
+        """
+        export_format = EXPORT_FORMATS[name]
+        entry = self._entry(timeline_text)
+        if (name, schedule_options) not in entry["exports"]:
+            df, developer_queries_list = entry["parsed"]
+            if schedule_options is not None:
+                df = self.schedule(timeline_text, schedule_options)[0]
+            entry["exports"][(name, schedule_options)] = export_format.writer(df, developer_queries_list)
+        return entry["exports"][(name, schedule_options)]
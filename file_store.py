@@ -0,0 +1,242 @@
+import heapq
+import os
+import shutil
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+USER_FILES_DIR = os.getenv("USER_FILES_DIR") or "user_files"
+USER_FILES_TTL_SEC = int(os.getenv("USER_FILES_TTL_SEC") or 3600)
+USER_FILES_QUOTA_MB = int(os.getenv("USER_FILES_QUOTA_MB") or 1024)
+USER_FILES_SWEEP_INTERVAL_SEC = int(os.getenv("USER_FILES_SWEEP_INTERVAL_SEC") or 60)
+
+# Files left in the flat pre-session layout of user_files/ are tracked under this key
+LEGACY_SESSION = "__legacy__"
+# Evicted session directories are renamed with this prefix before they are deleted
+TOMBSTONE_PREFIX = ".evicted-"
+
+
+class SessionFileStore:
+    """
+    Stores each session's files in its own subdirectory of `root` and expires idle sessions.
+
+    Request-path calls only update in-memory bookkeeping. A single background sweeper thread
+    pops expired sessions from an expiry heap and evicts the least recently used sessions
+    when the store is over its disk quota.
+    """
+
+    def __init__(self, root=USER_FILES_DIR, ttl_sec=USER_FILES_TTL_SEC,
+                 quota_bytes=USER_FILES_QUOTA_MB * 1024 * 1024,
+                 sweep_interval_sec=USER_FILES_SWEEP_INTERVAL_SEC):
+        self.root = root
+        self.ttl_sec = ttl_sec
+        self.quota_bytes = quota_bytes
+        self.sweep_interval_sec = sweep_interval_sec
+        self._lock = threading.Lock()
+        self._last_access = {}
+        self._files = {}  # session_id -> {path: size}
+        self._total_bytes = 0
+        # (expires_at, session_id); entries may be stale and are re-checked by the sweeper
+        self._expiry_heap = []
+        self._scheduled = set()
+        self._stop = threading.Event()
+        self._sweeper = None
+        os.makedirs(self.root, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        # One scan at startup so files from before a restart still expire
+        for entry in os.scandir(self.root):
+            if entry.name.startswith(TOMBSTONE_PREFIX):
+                # Left over from an eviction interrupted by a restart
+                shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.is_dir():
+                files = {}
+                last_access = entry.stat().st_mtime
+                for dirpath, _, filenames in os.walk(entry.path):
+                    for filename in filenames:
+                        path = os.path.join(dirpath, filename)
+                        stat = os.stat(path)
+                        files[path] = stat.st_size
+                        last_access = max(last_access, stat.st_mtime)
+                self._track(entry.name, files, last_access)
+            elif entry.is_file():
+                stat = entry.stat()
+                self._track(LEGACY_SESSION, {entry.path: stat.st_size},
+                            max(stat.st_mtime, self._last_access.get(LEGACY_SESSION, 0)))
+
+    def _track(self, session_id, files, last_access):
+        self._files.setdefault(session_id, {}).update(files)
+        self._total_bytes += sum(files.values())
+        self._last_access[session_id] = last_access
+        self._schedule(session_id, last_access + self.ttl_sec)
+
+    def _schedule(self, session_id, expires_at):
+        if session_id not in self._scheduled:
+            heapq.heappush(self._expiry_heap, (expires_at, session_id))
+            self._scheduled.add(session_id)
+
+    def start(self):
+        """
+        Starts the background sweeper thread if it is not already running.
+        """
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._run_sweeper, name="file-store-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_sweeper(self):
+        while not self._stop.wait(self.sweep_interval_sec):
+            self.sweep()
+
+    def touch(self, session_id):
+        """
+        Marks a session as active, pushing back its expiry.
+        """
+        with self._lock:
+            now = time.time()
+            self._last_access[session_id] = now
+            self._schedule(session_id, now + self.ttl_sec)
+
+    def session_dir(self, session_id):
+        """
+        Returns the directory for a session's files, creating it if needed.
+        """
+        path = os.path.join(self.root, session_id)
+        with self._lock:
+            if session_id not in self._files:
+                os.makedirs(path, exist_ok=True)
+                self._files[session_id] = {}
+        self.touch(session_id)
+        return path
+
+    def save_file(self, session_id, filename, data):
+        """
+        Writes `data` to a file in the session's directory and registers it.
+
+        Returns:
+            str: The path of the saved file.
+        """
+        path = os.path.join(self.session_dir(session_id), os.path.basename(filename))
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.register(session_id, path, size=len(data))
+        return path
+
+    def register(self, session_id, path, size=None):
+        """
+        Records a file written into the session's directory so it counts toward the quota.
+
+        Args:
+            size (int): The file size in bytes, read from disk when not given.
+        """
+        if size is None:
+            size = os.path.getsize(path)
+        with self._lock:
+            files = self._files.setdefault(session_id, {})
+            self._total_bytes += size - files.get(path, 0)
+            files[path] = size
+            self._last_access[session_id] = time.time()
+            self._schedule(session_id, self._last_access[session_id] + self.ttl_sec)
+
+    def remove(self, session_id, path):
+        """
+        Deletes one of the session's files.
+        """
+        if not path:
+            return
+        with self._lock:
+            self._total_bytes -= self._files.get(session_id, {}).pop(path, 0)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _evict(self, session_id):
+        """
+        Drops a session's bookkeeping and returns the paths to delete. Called with the lock held.
+
+        The session directory is renamed to a tombstone first, so a new upload saved to the same
+        session after the lock is released goes to a fresh directory and is not deleted with it.
+        """
+        files = self._files.pop(session_id, {})
+        self._total_bytes -= sum(files.values())
+        self._last_access.pop(session_id, None)
+        self._scheduled.discard(session_id)
+        if session_id == LEGACY_SESSION:
+            return list(files)
+        tombstone = os.path.join(self.root, f"{TOMBSTONE_PREFIX}{session_id}-{uuid.uuid4().hex}")
+        try:
+            os.rename(os.path.join(self.root, session_id), tombstone)
+        except FileNotFoundError:
+            return []
+        return [tombstone]
+
+    def _delete(self, paths):
+        for path in paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def sweep(self, now=None):
+        """
+        Evicts sessions idle for longer than the TTL, then the least recently used sessions
+        while the store is over its disk quota.
+
+        Returns:
+            int: The number of sessions evicted.
+        """
+        now = time.time() if now is None else now
+        evicted = []
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, session_id = heapq.heappop(self._expiry_heap)
+                self._scheduled.discard(session_id)
+                if session_id not in self._last_access:
+                    continue
+                expires_at = self._last_access[session_id] + self.ttl_sec
+                if expires_at > now:
+                    # Touched since it was scheduled
+                    self._schedule(session_id, expires_at)
+                else:
+                    evicted.append(self._evict(session_id))
+
+            if self._total_bytes > self.quota_bytes:
+                for session_id in sorted(self._last_access, key=self._last_access.get):
+                    if self._total_bytes <= self.quota_bytes:
+                        break
+                    evicted.append(self._evict(session_id))
+
+        # Files are deleted after releasing the lock so request-path calls do not wait on the disk
+        for paths in evicted:
+            self._delete(paths)
+        return len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._last_access),
+                "total_bytes": self._total_bytes,
+                "quota_bytes": self.quota_bytes,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_file_store():
+    """
+    Returns the SessionFileStore shared by every session, starting its sweeper on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionFileStore()
+            _store.start()
+        return _store
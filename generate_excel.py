@@ -1,8 +1,9 @@
 import csv
+import io
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
-import os
+import math
 
 def csv_to_dataframe(csv_content):
     """
@@ -34,7 +35,7 @@ def save_dataframe_to_excel(df, filename='project_timeline_temp.xlsx'):
     
     Args:
         df (DataFrame): A pandas DataFrame containing the project timeline.
-        filename (str): The name of the Excel file to save.
+        filename (str or file-like): The name of the Excel file, or a buffer, to save to.
     """
     df.to_excel(filename, index=False)
 
@@ -115,112 +116,178 @@ def add_summary_row(ws, df):
     # Merge the cells for the summary row
     ws.merge_cells(start_row=summary_row, start_column=1, end_row=summary_row, end_column=3)
 
-# Main function to process the GPT response and generate an Excel file
-def process_gpt_timeline_response(csv_content, user_id, feedback = False):
+# Function to add a Gantt chart sheet for a scheduled timeline
+def add_gantt_sheet(wb, df, max_columns=104):
     """
-    Processes GPT's timeline response, extracts CSV data, and generates an Excel file with merged cells,
-    adjusted column widths, and developer side queries included.
+    Adds a 'Gantt' sheet with one bar per row, critical path rows highlighted.
+    
+    Args:
+        wb (Workbook): The timeline workbook.
+        df (DataFrame): The timeline with schedule columns from schedule_timeline.
+        max_columns (int): Maximum number of time columns, longer projects are shown in weeks.
+    """
+    ws = wb.create_sheet("Gantt")
+    header_font = Font(name='Arial', bold=True, size=12, color="000000")
+    header_fill = PatternFill(start_color="89CFF0", end_color="89CFF0", fill_type="solid")
+    bar_fill = PatternFill(start_color="89CFF0", end_color="89CFF0", fill_type="solid")
+    critical_fill = PatternFill(start_color="F4A6A6", end_color="F4A6A6", fill_type="solid")
+
+    # One column per working day, or per working week (or more) when the project is long
+    project_days = int(math.ceil(df['End Day'].max())) if len(df) else 0
+    bucket_days = 1 if project_days <= max_columns else 5 * math.ceil(project_days / (5 * max_columns))
+    n_buckets = max(1, math.ceil(project_days / bucket_days))
+    bucket_prefix = "D" if bucket_days == 1 else "W" if bucket_days == 5 else f"{bucket_days}D-"
+
+    headers = ['Phase', 'Task', 'Subtask', 'Start Date', 'End Date']
+    headers += [f"{bucket_prefix}{bucket + 1}" for bucket in range(n_buckets)]
+    ws.append(headers)
+    for cell in ws[1]:
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(vertical='center', horizontal='center')
+
+    label_columns = len(headers) - n_buckets
+    for row_idx, row in enumerate(df.itertuples(index=False), start=2):
+        record = dict(zip(df.columns, row))
+        ws.cell(row=row_idx, column=1, value=record['Phase'])
+        ws.cell(row=row_idx, column=2, value=record['Task'])
+        ws.cell(row=row_idx, column=3, value=record['Subtask'])
+        ws.cell(row=row_idx, column=4, value=record['Start Date'].date()).number_format = 'yyyy-mm-dd'
+        ws.cell(row=row_idx, column=5, value=record['End Date'].date()).number_format = 'yyyy-mm-dd'
+
+        if record['End Day'] <= record['Start Day']:
+            continue
+        first_bucket = int(record['Start Day'] // bucket_days)
+        last_bucket = max(first_bucket, int(math.ceil(record['End Day'] / bucket_days)) - 1)
+        fill = critical_fill if record['Critical Path'] else bar_fill
+        for bucket in range(first_bucket, min(last_bucket, n_buckets - 1) + 1):
+            ws.cell(row=row_idx, column=label_columns + bucket + 1).fill = fill
+
+    for column_letter, column in zip(('A', 'B', 'C'), ('Phase', 'Task', 'Subtask')):
+        longest = df[column].astype(str).str.len().max() if len(df) else 0
+        ws.column_dimensions[column_letter].width = max(12, min(50, longest + 2))
+    ws.column_dimensions['D'].width = 12
+    ws.column_dimensions['E'].width = 12
+    for bucket in range(n_buckets):
+        ws.column_dimensions[ws.cell(row=1, column=label_columns + bucket + 1).column_letter].width = 5
+    ws.freeze_panes = ws.cell(row=2, column=label_columns + 1)
+
+# Function to split the GPT response into the timeline DataFrame and developer queries
+def parse_gpt_timeline_response(csv_content):
+    """
+    Splits GPT's timeline response into the timeline data and the developer side queries.
     
     Args:
         csv_content (str): The GPT response containing CSV timeline data.
+    
+    Returns:
+        tuple: The timeline DataFrame and the list of developer side queries.
     """
+    # Split the CSV content into sections based on empty lines
+    sections = csv_content.split("\n\n")
+
+    # Process the main timeline data
+    timeline_data = sections[0]
+    df = csv_to_dataframe(timeline_data)
+
+    # Check if developer queries are provided
+    developer_queries = sections[1] if len(sections) > 1 else None
+    developer_queries_list = developer_queries.splitlines() if developer_queries else []
+
+    # Remove the header "Developer Side Queries:" if it already exists in the list
+    if developer_queries_list and developer_queries_list[0].strip().lower().startswith("developer side queries"):
+        developer_queries_list.pop(0)
+
+    return df, developer_queries_list
+
+# Function to build the styled timeline workbook
+def build_timeline_workbook(df, developer_queries_list):
+    """
+    Builds the timeline workbook with merged cells, adjusted column widths, a summary row
+    and the developer side queries.
     
-    if csv_content:
-        # Split the CSV content into sections based on empty lines
-        sections = csv_content.split("\n\n")
-        
-        # Process the main timeline data
-        timeline_data = sections[0]
-        # print("timeline_data: ", timeline_data)
-        df = csv_to_dataframe(timeline_data)
-        
-        # Check if developer queries are provided
-        developer_queries = sections[1] if len(sections) > 1 else None
-        developer_queries_list = developer_queries.splitlines() if developer_queries else []
-
-        # Remove the header "Developer Side Queries:" if it already exists in the list
-        if developer_queries_list and developer_queries_list[0].strip().lower().startswith("developer side queries"):
-            developer_queries_list.pop(0)
-
-        # Save the DataFrame to a temporary Excel file
-        save_dataframe_to_excel(df)
-
-        # Load the Excel file to apply merging and column width adjustment
-        wb = load_workbook('project_timeline_temp.xlsx')
-        ws = wb.active
-
-        # Define font and header color
-        header_font = Font(name='Arial', bold=True, size=12, color="000000")  # Black font
-        header_fill = PatternFill(start_color="89CFF0", end_color="89CFF0", fill_type="solid")  # Blue fill
-        total_row_font = Font(name='Arial', bold=True, size=12, color="000000")  # Black font for totals
-        total_row_fill = PatternFill(start_color="89CFF0", end_color="89CFF0", fill_type="solid")  # Blue fill for totals
-        default_font = Font(name='Arial', size=11)  # Default font for all other cells
-
-        # Define border style
-        thin_border = Border(left=Side(style='thin'),
-                            right=Side(style='thin'),
-                            top=Side(style='thin'),
-                            bottom=Side(style='thin'))
-
-        # Merge cells for 'Phase', 'Task', and 'Subtask'
-        merge_cells(ws, 1, df)  # Merge 'Phase' (Column 1 - A)
-        merge_cells(ws, 2, df)  # Merge 'Task' (Column 2 - B)
-
-        # Adjust column widths
-        auto_adjust_column_width(ws)
-
-        # Center align 'Total Time (Days)' and 'Total Time (Hours)' columns
-        center_align_column(ws, 4, 2, len(df) + 1)  # Align 'Total Time (Days)' (Column 4 - D)
-        center_align_column(ws, 5, 2, len(df) + 1)  # Align 'Total Time (Hours)' (Column 5 - E)
-
-        # Add summary row with totals
-        add_summary_row(ws, df)
-
-        # Apply Arial font to all cells
-        for row in ws.iter_rows():
-            for cell in row:
-                cell.font = default_font  # Set default font for all cells
-                cell.border = thin_border  # Add border to header cells
-
-        # Set header styles
-        for cell in ws[1]:  # Assuming headers are in the first row
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = thin_border  # Add border to header cells
+    Args:
+        df (DataFrame): The timeline DataFrame.
+        developer_queries_list (list): The developer side queries.
+    
+    Returns:
+        Workbook: The styled openpyxl workbook.
+    """
+    # Save the DataFrame to an in-memory Excel file, a shared temp file would race between sessions
+    buffer = io.BytesIO()
+    save_dataframe_to_excel(df, buffer)
+    buffer.seek(0)
+
+    # Load the Excel file to apply merging and column width adjustment
+    wb = load_workbook(buffer)
+    ws = wb.active
+
+    # Define font and header color
+    header_font = Font(name='Arial', bold=True, size=12, color="000000")  # Black font
+    header_fill = PatternFill(start_color="89CFF0", end_color="89CFF0", fill_type="solid")  # Blue fill
+    total_row_font = Font(name='Arial', bold=True, size=12, color="000000")  # Black font for totals
+    total_row_fill = PatternFill(start_color="89CFF0", end_color="89CFF0", fill_type="solid")  # Blue fill for totals
+    default_font = Font(name='Arial', size=11)  # Default font for all other cells
+
+    # Define border style
+    thin_border = Border(left=Side(style='thin'),
+                        right=Side(style='thin'),
+                        top=Side(style='thin'),
+                        bottom=Side(style='thin'))
+
+    # Merge cells for 'Phase', 'Task', and 'Subtask'
+    merge_cells(ws, 1, df)  # Merge 'Phase' (Column 1 - A)
+    merge_cells(ws, 2, df)  # Merge 'Task' (Column 2 - B)
 
-        # Style the last row (summary totals)
-        last_row = len(df) + 2  # Assuming summary is the last row
-        for cell in ws[last_row]:  # Apply styles to the last row
-            cell.font = total_row_font
-            cell.fill = total_row_fill
+    # Adjust column widths
+    auto_adjust_column_width(ws)
+
+    # Center align 'Total Time (Days)' and 'Total Time (Hours)' columns
+    center_align_column(ws, 4, 2, len(df) + 1)  # Align 'Total Time (Days)' (Column 4 - D)
+    center_align_column(ws, 5, 2, len(df) + 1)  # Align 'Total Time (Hours)' (Column 5 - E)
+
+    # Add summary row with totals
+    add_summary_row(ws, df)
+
+    # Apply Arial font to all cells
+    for row in ws.iter_rows():
+        for cell in row:
+            cell.font = default_font  # Set default font for all cells
             cell.border = thin_border  # Add border to header cells
 
-        # Insert the Developer Side Queries section below the Total Time table
-        if developer_queries_list:
-            # Leave a blank row after the summary
-            dev_query_start_row = last_row + 2
-            ws.cell(row=dev_query_start_row, column=1, value="Developer Side Queries:")
-            ws.cell(row=dev_query_start_row, column=1).font = header_font
-            ws.cell(row=dev_query_start_row, column=1).alignment = Alignment(vertical='center', horizontal='left')
-
-            # Add each query to a new row
-            for idx, query in enumerate(developer_queries_list, start=dev_query_start_row + 1):
-                ws.cell(row=idx, column=1, value=query)
-                ws.cell(row=idx, column=1).alignment = Alignment(vertical='top', horizontal='left')
-                ws.cell(row=idx, column=1).font = default_font
-        
-        # Remove the temp excel
-        if os.path.exists('project_timeline_temp.xlsx'):
-            os.remove('project_timeline_temp.xlsx')
-
-        # Save the final Excel file with merged cells, adjusted widths, and developer queries
-        if not feedback:
-            wb.save(f'user_files/{user_id}_project_timeline.xlsx')
-            return f'user_files/{user_id}_project_timeline.xlsx'
-        else:
-            wb.save(f'user_files/{user_id}_updated_project_timeline.xlsx')
-            return f'user_files/{user_id}_updated_project_timeline.xlsx'
-
-        # print("Timeline saved as 'project_timeline.xlsx' with merged cells, adjusted column widths, and developer queries.")
-    else:
-        print("No CSV content found in the GPT response.")
+    # Set header styles
+    for cell in ws[1]:  # Assuming headers are in the first row
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.border = thin_border  # Add border to header cells
+
+    # Style the last row (summary totals)
+    last_row = len(df) + 2  # Assuming summary is the last row
+    for cell in ws[last_row]:  # Apply styles to the last row
+        cell.font = total_row_font
+        cell.fill = total_row_fill
+        cell.border = thin_border  # Add border to header cells
+
+    # Insert the Developer Side Queries section below the Total Time table
+    if developer_queries_list:
+        # Leave a blank row after the summary
+        dev_query_start_row = last_row + 2
+        ws.cell(row=dev_query_start_row, column=1, value="Developer Side Queries:")
+        ws.cell(row=dev_query_start_row, column=1).font = header_font
+        ws.cell(row=dev_query_start_row, column=1).alignment = Alignment(vertical='center', horizontal='left')
+
+        # Add each query to a new row
+        for idx, query in enumerate(developer_queries_list, start=dev_query_start_row + 1):
+            ws.cell(row=idx, column=1, value=query)
+            ws.cell(row=idx, column=1).alignment = Alignment(vertical='top', horizontal='left')
+            ws.cell(row=idx, column=1).font = default_font
+
+    # Scheduled timelines get date formatting and a Gantt chart sheet
+    if 'Start Day' in df.columns:
+        for col_idx, column in enumerate(df.columns, start=1):
+            if column in ('Start Date', 'End Date'):
+                for row in range(2, len(df) + 2):
+                    ws.cell(row=row, column=col_idx).number_format = 'yyyy-mm-dd'
+        add_gantt_sheet(wb, df)
+
+    return wb
@@ -1,12 +1,14 @@
 import os
 import openai
 from dotenv import load_dotenv
+from request_scheduler import create_chat_completion
 
 load_dotenv()
 
 open_ai_key = os.getenv("OPENAI_API_KEY")
 open_ai_model = os.getenv("OPEN_AI_MODEL")
-client = openai.OpenAI(api_key=open_ai_key)
+# Retries are handled by the shared request scheduler
+client = openai.OpenAI(api_key=open_ai_key, max_retries=0)
 
 
 def generate_timeline_with_user_feedback(timeline_text, feedback):
@@ -39,7 +41,8 @@ def generate_timeline_with_user_feedback(timeline_text, feedback):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
@@ -1,12 +1,26 @@
+import contextvars
+import csv
+import io
 import os
+import re
 import openai
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from request_scheduler import create_chat_completion
+from duration_memory import get_duration_memory, parse_timeline_rows, format_duration
+from pipeline_checkpoints import get_checkpoint_store, document_hash
 
 load_dotenv()
 
 open_ai_key = os.getenv("OPENAI_API_KEY")
 open_ai_model = os.getenv("OPEN_AI_MODEL")
-client = openai.OpenAI(api_key=open_ai_key)
+# Retries are handled by the shared request scheduler
+client = openai.OpenAI(api_key=open_ai_key, max_retries=0)
+
+DURATION_HEADER = ["Phase", "Task", "Subtask", "Total Time (Days)", "Total Time (Hours)"]
+SECTION_WORKERS = int(os.getenv("SECTION_WORKERS") or 4)
+# Bump when a prompt changes, so saved stage outputs of the old prompts are not resumed
+PROMPT_VERSION = "1"
 
 def generate_timeline(requirement_chunks):
     messages = [
@@ -43,7 +57,8 @@ def generate_timeline(requirement_chunks):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
@@ -83,7 +98,8 @@ def generate_timeline_with_feedback(timeline_text, feedback):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
@@ -116,7 +132,8 @@ def validate_timeline(requirement_chunks, timeline_text):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=validation_messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
@@ -156,7 +173,8 @@ def generate_durations_for_timeline(timeline_text):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=duration_messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
@@ -168,8 +186,120 @@ def generate_durations_for_timeline(timeline_text):
     return duration_timeline_text
 
 
+def generate_durations_for_rows(rows_csv):
+    duration_messages = [
+        {
+            "role": "system",
+            "content": (
+                "You are a project assistant skilled in estimating durations for tasks and subtasks for  Machine Learning (ML), Full-Stack (FS), and DevOps engineering based on the tasks and subtasks in the provided timeline, "
+                "Estimate realistic durations in days and hours. Update the timeline by adding 'Total Time (Days)' and 'Total Time (Hours)' columns."
+                "Strictly ensure that if there are no subtask or there is a dash (-), then estimate the duration based on the task associated, don't estimate any duration as 0"
+                "Strictly keep every row and its 'Row' number unchanged, and do not add, remove, merge or reorder rows."
+                "Output the CSV data with no backticks (```) or the keyword 'csv' at the beginning."
+            )
+        },
+        {
+            "role": "user",
+            "content": (
+                "Add estimated durations to the following timeline rows:\n\n"
+                f"{rows_csv}\n\n"
+                "Output the rows strictly in CSV format as follows:\n"
+                "Row,Phase,Task,Subtask,Total Time (Days),Total Time (Hours)\n"
+                "Ensure no extra text or formatting outside of this structure."
+            )
+        }
+    ]
+
+    response = create_chat_completion(
+        client,
+        model=open_ai_model,
+        messages=duration_messages,
+        max_tokens=int(os.getenv('MAX_TOKENS')),
+        n=1,
+        temperature=float(os.getenv('TEMPERATURE')),
+    )
+
+    return response.choices[0].message.content
+
+
+def rows_to_csv(header, rows):
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return output.getvalue().strip()
+
+
+def merge_duration_rows(rows, local_estimates, generated_rows):
+    """
+    Combines locally matched estimates with the durations generated for the remaining rows,
+    keeping the original rows and their order.
+
+    Args:
+        rows (list): The timeline rows.
+        local_estimates (list): The memory estimate of every row, None where there was no match.
+        generated_rows (list): Rows of (row number, phase, task, subtask, days, hours) for the unmatched rows,
+            numbered by their position in `rows`.
+
+    Returns:
+        list: The merged rows, or None when the generated rows do not answer exactly the unmatched rows.
+    """
+    generated_by_row = {}
+    for row in generated_rows:
+        if len(row) < 6 or not row[0].isdigit() or int(row[0]) in generated_by_row:
+            return None
+        generated_by_row[int(row[0])] = row[4:6]
+
+    unmatched = {idx for idx, estimate in enumerate(local_estimates) if estimate is None}
+    if set(generated_by_row) != unmatched:
+        return None
+
+    merged_rows = []
+    for idx, (row, estimate) in enumerate(zip(rows, local_estimates)):
+        if estimate is None:
+            merged_rows.append(row[:3] + generated_by_row[idx])
+        else:
+            days, hours, _ = estimate
+            merged_rows.append(row[:3] + [format_duration(days), format_duration(hours)])
+    return merged_rows
+
+
+def generate_durations_with_memory(timeline_text):
+    """
+    Fills in durations from the duration memory, sending only the unmatched rows to the model.
+
+    Returns:
+        tuple: (timeline_with_durations, used_model). timeline_with_durations is None when the memory
+            cannot be used: no rows, no confident match, or generated rows that do not line up.
+    """
+    _, rows = parse_timeline_rows(timeline_text)
+    if not rows:
+        return None, False
+
+    local_estimates = get_duration_memory().lookup_many(rows)
+    if all(estimate is None for estimate in local_estimates):
+        return None, False
+
+    # Unmatched rows are numbered by position so their durations cannot be given to another subtask
+    unmatched_rows = [[str(idx)] + row[:3] for idx, (row, estimate) in enumerate(zip(rows, local_estimates))
+                      if estimate is None]
+    generated_rows = []
+    if unmatched_rows:
+        generated_text = generate_durations_for_rows(rows_to_csv(["Row"] + DURATION_HEADER[:3], unmatched_rows))
+        _, generated_rows = parse_timeline_rows(generated_text)
+
+    merged_rows = merge_duration_rows(rows, local_estimates, generated_rows)
+    if merged_rows is None:
+        return None, True
+    return rows_to_csv(DURATION_HEADER, merged_rows), bool(unmatched_rows)
+
+
 def evaluate_durations(timeline_text, max_duration_iterations=2):
-    timeline_with_durations = generate_durations_for_timeline(timeline_text)
+    timeline_with_durations, used_model = generate_durations_with_memory(timeline_text)
+    if timeline_with_durations is None:
+        timeline_with_durations = generate_durations_for_timeline(timeline_text)
+    elif not used_model:
+        return timeline_with_durations
     for iteration in range(max_duration_iterations):
         validation_result = validate_timeline_for_durations(timeline_with_durations)
         if validation_result is None:
@@ -197,7 +327,8 @@ def validate_timeline_for_durations(timeline_text):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=validation_messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
@@ -209,8 +340,23 @@ def validate_timeline_for_durations(timeline_text):
     # return validation_result if validation_result.lower() != "valid" else None
     return validation_result
 
-def refine_timeline(requirement_chunks, max_iterations=5):
-    timeline_text = generate_timeline(requirement_chunks)
+def pipeline_version(max_iterations):
+    """
+    Identifies the settings a refine_timeline run depends on, so checkpoints are only resumed by the same pipeline.
+    """
+    return f"{open_ai_model}|{os.getenv('MAX_TOKENS')}|{os.getenv('TEMPERATURE')}|{max_iterations}|prompts-v{PROMPT_VERSION}"
+
+
+def refine_timeline(requirement_chunks, max_iterations=5, checkpoints=None, reuse_finished=False, purge=True):
+    # Stage outputs are checkpointed while the run is unfinished, so an interrupted run resumes after
+    # its last completed stage. A finished run is not replayed, generating again starts over,
+    # unless reuse_finished is set. purge is off when the caller already purged expired runs.
+    checkpoints = checkpoints or get_checkpoint_store()
+    doc_hash = document_hash(requirement_chunks)
+    pipeline = pipeline_version(max_iterations)
+    checkpoints.begin(doc_hash, pipeline, reuse_finished=reuse_finished, purge=purge)
+
+    timeline_text = checkpoints.run(doc_hash, "generate", generate_timeline, requirement_chunks, pipeline=pipeline)
     # print(f"initial timeline: {timeline_text}\n")
     sections = timeline_text.split("\n\n")
     developer_queries_section = None
@@ -219,14 +365,73 @@ def refine_timeline(requirement_chunks, max_iterations=5):
 
     for iteration in range(max_iterations):
         # print(f"iteration: {iteration + 1}\n")
-        feedback = validate_timeline(requirement_chunks, timeline_text)
+        feedback = checkpoints.run(doc_hash, f"validate_{iteration + 1}", validate_timeline, requirement_chunks, timeline_text,
+                                   pipeline=pipeline)
         # print(f"feedback: {feedback}\n")
         if feedback is None:
             break
-        timeline_text = generate_timeline_with_feedback(timeline_text, feedback)
+        timeline_text = checkpoints.run(doc_hash, f"feedback_{iteration + 1}", generate_timeline_with_feedback, timeline_text, feedback,
+                                        pipeline=pipeline)
         # print(f"after feedback : {timeline_text}\n")
 
-    timeline_text = evaluate_durations(timeline_text)
+    # Durations always run, so estimates learned since the last run are used; the stage is only recorded for profiling
+    timeline_text = checkpoints.run(doc_hash, "durations", evaluate_durations, timeline_text, pipeline=pipeline, reuse=False)
+    checkpoints.finish(doc_hash, pipeline)
     if developer_queries_section:
         timeline_text += f"\n\n{developer_queries_section}"
     return timeline_text
+
+
+def section_document_hash(section):
+    """
+    Returns the checkpoint key of one document section, so unchanged sections are not reprocessed.
+    """
+    return document_hash([section.page_content])
+
+
+def merge_section_timelines(section_timelines):
+    """
+    Combines the timelines of several sections into one timeline, keeping a single header
+    and renumbering the Developer Side Queries.
+    """
+    rows = []
+    queries = []
+    for timeline_text in section_timelines:
+        _, section_rows = parse_timeline_rows(timeline_text)
+        rows.extend(row[:5] for row in section_rows)
+        sections = timeline_text.split("\n\n")
+        if len(sections) > 1 and sections[1].strip().lower().startswith("developer side queries"):
+            for line in sections[1].splitlines()[1:]:
+                query = re.sub(r"^\s*\d+[.)]\s*", "", line).strip()
+                if query:
+                    queries.append(query)
+
+    timeline_text = rows_to_csv(DURATION_HEADER, rows)
+    if queries:
+        numbered = "\n".join(f"{number}. {query}" for number, query in enumerate(queries, start=1))
+        timeline_text += f"\n\nDeveloper Side Queries:\n{numbered}"
+    return timeline_text
+
+
+def refine_timeline_sections(sections, max_iterations=5, checkpoints=None, max_workers=SECTION_WORKERS):
+    """
+    Runs refine_timeline on each document section concurrently and merges the results.
+    Sections are checkpointed individually and a section's finished run is reused while it is
+    kept in the checkpoint store, so editing one section only regenerates that section's timeline.
+    Durations are estimated again for every section.
+
+    Args:
+        sections (list): Section documents from loaders.split_file_into_sections.
+    """
+    checkpoints = checkpoints or get_checkpoint_store()
+    # Expired runs are purged once here rather than by every section's run
+    checkpoints.purge()
+    # Each worker runs in a copy of the caller's context so its calls stay queued under the caller's session
+    contexts = [contextvars.copy_context() for _ in sections]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(context.run, refine_timeline, [section.page_content], max_iterations, checkpoints, True, False)
+            for context, section in zip(contexts, sections)
+        ]
+        section_timelines = [future.result() for future in futures]
+    return merge_section_timelines(section_timelines)
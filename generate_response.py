@@ -1,13 +1,15 @@
 import os
 import openai
 from dotenv import load_dotenv
+from request_scheduler import create_chat_completion
 from generate_feedback import generate_timeline_with_user_feedback
 
 load_dotenv()
 
 open_ai_key = os.getenv("OPENAI_API_KEY")
 open_ai_model = os.getenv("OPEN_AI_MODEL")
-client = openai.OpenAI(api_key=open_ai_key)
+# Retries are handled by the shared request scheduler
+client = openai.OpenAI(api_key=open_ai_key, max_retries=0)
 
 def generate_timeline(requirement_chunks):
     # Create messages for the chat model
@@ -46,7 +48,8 @@ def generate_timeline(requirement_chunks):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
@@ -79,7 +82,8 @@ def validate_timeline(requirement_chunks, timeline_text):
         }
     ]
 
-    response = client.chat.completions.create(
+    response = create_chat_completion(
+        client,
         model=open_ai_model,
         messages=validation_messages,
         max_tokens=int(os.getenv('MAX_TOKENS')),
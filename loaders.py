@@ -1,16 +1,25 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import UnstructuredExcelLoader
-from langchain_community.document_loaders import UnstructuredHTMLLoader
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.document_loaders import TextLoader
 from langchain_community.document_loaders import Docx2txtLoader
+from langchain_core.documents import Document
 from generate_final_timeline import *
+from collections import Counter
+from bs4 import BeautifulSoup
+from pypdf import PdfReader
+import xml.etree.ElementTree as ET
+import zipfile
+import re
 
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+# Sections are grouped under their headings down to this depth, e.g. 2 groups subsections under their H2
+SECTION_GROUP_DEPTH = int(os.getenv("SECTION_GROUP_DEPTH") or 2)
+
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=int(os.getenv('CHUNK_SIZE')),
     chunk_overlap=int(os.getenv('CHUNK_OVERLAP'))
@@ -26,9 +35,9 @@ def load_docx(file_path):
     return data
 
 def load_html_page(file_path):
-    loader = UnstructuredHTMLLoader(file_path=file_path)
-    data = loader.load()
-    return data
+    # Read with BeautifulSoup, the same way as for section chunking
+    text = "\n".join(text for _, text in html_blocks(file_path))
+    return [Document(page_content=text, metadata={"source": file_path})]
 
 def load_pdf(file_path):
     loader = PyPDFLoader(file_path=file_path)
@@ -43,7 +52,7 @@ def load_text(file_path):
 def load_file(file_path):
     if file_path.endswith('.xlsx'):
         return load_csv(file_path)
-    elif file_path.endswith('.txt'):
+    elif file_path.endswith(('.txt', '.md')):
         return load_text(file_path)
     elif file_path.endswith('.pdf'):
         return load_pdf(file_path)
@@ -64,6 +73,288 @@ def split_file(file_path):
     chunks = split_text(text)
     return chunks
 
+# Structure-aware section chunking
+
+WORD_NS = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+HTML_BLOCK_TAGS = HEADING_TAGS + ["p", "li", "pre", "td", "th", "dt", "dd", "blockquote"]
+
+def _word_attr(element, name):
+    return element.get(f"{{{WORD_NS['w']}}}{name}")
+
+def docx_heading_levels(docx_zip):
+    """
+    Maps DOCX paragraph style IDs to heading levels using styles.xml, so renamed or
+    localized heading styles are still recognised.
+    """
+    levels = {}
+    if "word/styles.xml" not in docx_zip.namelist():
+        return levels
+    root = ET.fromstring(docx_zip.read("word/styles.xml"))
+    for style in root.findall("w:style", WORD_NS):
+        style_id = _word_attr(style, "styleId")
+        name = style.find("w:name", WORD_NS)
+        name = (_word_attr(name, "val") if name is not None else "") or ""
+        outline = style.find("w:pPr/w:outlineLvl", WORD_NS)
+        match = re.match(r"heading\s*(\d)", name, re.IGNORECASE)
+        if match:
+            levels[style_id] = int(match.group(1))
+        elif name.lower() == "title":
+            levels[style_id] = 1
+        elif outline is not None and (_word_attr(outline, "val") or "").isdigit():
+            levels[style_id] = int(_word_attr(outline, "val")) + 1
+    return levels
+
+def docx_blocks(file_path):
+    """
+    Reads a DOCX file as (heading level or None, text) blocks in document order.
+    """
+    with zipfile.ZipFile(file_path) as docx_zip:
+        levels = docx_heading_levels(docx_zip)
+        root = ET.fromstring(docx_zip.read("word/document.xml"))
+
+    blocks = []
+    body = root.find("w:body", WORD_NS)
+    for element in body:
+        tag = element.tag.split("}")[-1]
+        if tag == "p":
+            text = "".join(node.text or "" for node in element.iter(f"{{{WORD_NS['w']}}}t")).strip()
+            if not text:
+                continue
+            style = element.find("w:pPr/w:pStyle", WORD_NS)
+            outline = element.find("w:pPr/w:outlineLvl", WORD_NS)
+            level = levels.get(_word_attr(style, "val")) if style is not None else None
+            if level is None and outline is not None and (_word_attr(outline, "val") or "").isdigit():
+                level = int(_word_attr(outline, "val")) + 1
+            blocks.append((level, text))
+        elif tag == "tbl":
+            # Tables are kept as content of the current section, one line per row
+            for row in element.iter(f"{{{WORD_NS['w']}}}tr"):
+                cells = ["".join(node.text or "" for node in cell.iter(f"{{{WORD_NS['w']}}}t")).strip()
+                         for cell in row.iter(f"{{{WORD_NS['w']}}}tc")]
+                if any(cells):
+                    blocks.append((None, " | ".join(cells)))
+    return blocks
+
+def _flatten_pdf_outline(reader, outline, depth=1):
+    entries = []
+    for item in outline:
+        if isinstance(item, list):
+            entries.extend(_flatten_pdf_outline(reader, item, depth + 1))
+            continue
+        try:
+            page_number = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page_number is not None and page_number >= 0:
+            entries.append((page_number, depth, str(item.title).strip()))
+    return entries
+
+def pdf_outline_blocks(reader):
+    """
+    Reads a PDF with bookmarks as blocks, starting a section at each bookmark's title
+    (or at the top of its page when the title is not found in the page text).
+    """
+    try:
+        entries = _flatten_pdf_outline(reader, reader.outline)
+    except Exception:
+        return None
+    if not entries:
+        return None
+
+    entries_by_page = {}
+    for page_number, depth, title in entries:
+        entries_by_page.setdefault(page_number, []).append((depth, title))
+
+    blocks = []
+    for page_number, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+        position = 0
+        for depth, title in entries_by_page.get(page_number, []):
+            found = text.find(title, position) if title else -1
+            if found >= 0:
+                if text[position:found].strip():
+                    blocks.append((None, text[position:found].strip()))
+                position = found + len(title)
+            blocks.append((depth, title))
+        if text[position:].strip():
+            blocks.append((None, text[position:].strip()))
+    return blocks
+
+def pdf_font_size_blocks(reader, min_ratio=1.15, max_heading_chars=120):
+    """
+    Reads a PDF without bookmarks as blocks, treating short lines set noticeably larger
+    than the body text as headings. Larger sizes are higher heading levels.
+    """
+    lines = []
+    for page in reader.pages:
+        page_lines = [["", 0.0]]
+
+        def visitor(text, cm, tm, font_dict, font_size):
+            size = font_size * (abs(tm[3]) or 1) * (abs(cm[3]) or 1)
+            for index, piece in enumerate(text.split("\n")):
+                if index:
+                    page_lines.append(["", 0.0])
+                if piece.strip():
+                    page_lines[-1][0] += piece
+                    page_lines[-1][1] = max(page_lines[-1][1], size)
+
+        page.extract_text(visitor_text=visitor)
+        lines.extend((text.strip(), round(size, 1)) for text, size in page_lines if text.strip())
+    if not lines:
+        return []
+
+    # The most common size by character count is the body text
+    char_counts = Counter()
+    for text, size in lines:
+        char_counts[size] += len(text)
+    body_size = char_counts.most_common(1)[0][0]
+
+    def is_heading(text, size):
+        return size >= body_size * min_ratio and len(text) <= max_heading_chars and not text.endswith(".")
+
+    heading_sizes = sorted({size for text, size in lines if is_heading(text, size)}, reverse=True)
+    heading_levels = {size: min(level, 3) for level, size in enumerate(heading_sizes, start=1)}
+    return [(heading_levels[size] if is_heading(text, size) else None, text) for text, size in lines]
+
+def pdf_blocks(file_path):
+    reader = PdfReader(file_path)
+    blocks = pdf_outline_blocks(reader)
+    if blocks is None:
+        blocks = pdf_font_size_blocks(reader)
+    return blocks
+
+def markdown_blocks(text):
+    """
+    Reads Markdown (or plain text) as blocks, ignoring '#' lines inside code fences.
+    """
+    blocks = []
+    in_code = False
+    paragraph = []
+    for line in text.splitlines():
+        if line.strip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else re.match(r"^(#{1,6})\s+(.+?)\s*#*\s*$", line)
+        if match:
+            if paragraph:
+                blocks.append((None, "\n".join(paragraph).strip()))
+                paragraph = []
+            blocks.append((len(match.group(1)), match.group(2)))
+        else:
+            paragraph.append(line)
+    if "\n".join(paragraph).strip():
+        blocks.append((None, "\n".join(paragraph).strip()))
+    return blocks
+
+def html_blocks(file_path):
+    with open(file_path, "rb") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    blocks = []
+    for element in soup.find_all(HTML_BLOCK_TAGS):
+        # Nested blocks (e.g. a <p> inside an <li>) are read through their outermost block
+        if element.name not in HEADING_TAGS and element.find_parent(HTML_BLOCK_TAGS):
+            continue
+        text = element.get_text(" ", strip=True)
+        if text:
+            level = int(element.name[1]) if element.name in HEADING_TAGS else None
+            blocks.append((level, text))
+    return blocks
+
+def load_blocks(file_path):
+    if file_path.endswith('.docx'):
+        return docx_blocks(file_path)
+    elif file_path.endswith('.pdf'):
+        return pdf_blocks(file_path)
+    elif file_path.endswith('.html'):
+        return html_blocks(file_path)
+    elif file_path.endswith(('.md', '.txt')):
+        with open(file_path, encoding="utf-8", errors="ignore") as f:
+            return markdown_blocks(f.read())
+    else:
+        # No usable structure, the whole document is one section
+        pages = load_file(file_path)
+        return [(None, "\n".join(page.page_content for page in pages))]
+
+def blocks_to_sections(blocks):
+    """
+    Groups blocks into sections, one per heading, each with the path of headings above it.
+    """
+    sections = []
+    heading_path = []
+    content = []
+
+    def close_section():
+        text = "\n".join(content).strip()
+        if text:
+            sections.append({"heading_path": [title for _, title in heading_path], "text": text})
+
+    for level, text in blocks:
+        if level is None:
+            content.append(text)
+            continue
+        close_section()
+        content = []
+        while heading_path and heading_path[-1][0] >= level:
+            heading_path.pop()
+        heading_path.append((level, text))
+    close_section()
+    return sections
+
+def section_document(section_texts, heading_paths, file_path, section_index):
+    # The heading path is repeated in the content so each section can be processed on its own
+    parts = []
+    for heading_path, text in zip(heading_paths, section_texts):
+        parts.append(f"{' > '.join(heading_path)}\n{text}" if heading_path else text)
+    return Document(
+        page_content="\n\n".join(parts),
+        metadata={
+            "source": file_path,
+            "section_index": section_index,
+            "heading_path": heading_paths[0],
+            "heading_paths": heading_paths,
+        },
+    )
+
+def split_file_into_sections(file_path, max_chars=None, group_depth=None):
+    """
+    Splits a DOCX, PDF, Markdown, text or HTML file into section-aligned chunks.
+
+    Sections come from DOCX heading styles, PDF bookmarks (or font sizes when there are none)
+    and Markdown/HTML headings. Every section is grouped with the other sections under the same
+    headings down to `group_depth`, so chunk boundaries only depend on the headings and editing a
+    section only changes the chunk of its own group. Groups larger than `max_chars` are split into
+    their sections, and sections larger than `max_chars` with the character splitter.
+
+    Returns:
+        list: Documents with 'heading_path', 'heading_paths' and 'section_index' metadata.
+    """
+    max_chars = max_chars or int(os.getenv('CHUNK_SIZE'))
+    group_depth = group_depth or SECTION_GROUP_DEPTH
+    sections = blocks_to_sections(load_blocks(file_path))
+
+    groups = []
+    for section in sections:
+        group_key = section["heading_path"][:group_depth]
+        if not groups or groups[-1][0] != group_key:
+            groups.append((group_key, []))
+        groups[-1][1].append(section)
+
+    documents = []
+    for group_key, group_sections in groups:
+        texts = [section["text"] for section in group_sections]
+        paths = [section["heading_path"] for section in group_sections]
+        document = section_document(texts, paths, file_path, len(documents))
+        if len(document.page_content) <= max_chars:
+            documents.append(document)
+            continue
+        # Too large as a group, so each section becomes its own chunk and long sections are split,
+        # every piece keeping the heading path of its own section
+        for text, path in zip(texts, paths):
+            parts = [text] if len(text) <= max_chars else split_text(text)
+            for part in parts:
+                documents.append(section_document([part], [path], file_path, len(documents)))
+    return documents
+
 # # Example purpose
 # file_path=os.getenv('PDF_FILE_PATH')
 # chunks=split_file(file_path)
@@ -1,15 +1,19 @@
 import streamlit as st
-from st_aggrid import AgGrid, GridOptionsBuilder
-from generate_final_timeline import refine_timeline
-from generate_excel import process_gpt_timeline_response
+from generate_final_timeline import refine_timeline, refine_timeline_sections, section_document_hash
 from generate_feedback import generate_timeline_with_user_feedback
 from  generate_final_timeline import *
-from loaders import split_file
+from loaders import split_file, split_file_into_sections
+from duration_memory import get_duration_memory
+from request_scheduler import set_session, get_scheduler
+from file_store import get_file_store
+from timeline_history import TimelineHistory
+from export_timeline import EXPORT_FORMATS, TimelineExporter
+from schedule_timeline import DEPENDENCY_MODES
+from timeline_grid import render_timeline_grid
+from pipeline_checkpoints import get_checkpoint_store, document_hash
 import pandas as pd
 import os
 import uuid
-import glob
-import time
 
 # Set the page layout to wide
 st.set_page_config(layout="wide")
@@ -19,78 +23,133 @@ st.title("Timeline Generator Bot")
 # Initialize session state variables
 if "user_id" not in st.session_state:
     st.session_state.user_id = str(uuid.uuid4())  # Generate unique user ID
+# Queue this session's OpenAI calls under its own user ID in the shared scheduler
+set_session(st.session_state.user_id)
+# Keep this session's files from expiring while it is in use
+file_store = get_file_store()
+file_store.touch(st.session_state.user_id)
 # Initialize session state variables
 if "uploaded_file_path" not in st.session_state:
     st.session_state.uploaded_file_path = None
+if "uploaded_file_id" not in st.session_state:
+    st.session_state.uploaded_file_id = None
 if "timeline_text" not in st.session_state:
     st.session_state.timeline_text = None
-if "excel_file_path" not in st.session_state:
-    st.session_state.excel_file_path = None
 if "updated_timeline_text" not in st.session_state:
     st.session_state.updated_timeline_text = None
-if "modified_excel_file_path" not in st.session_state:
-    st.session_state.modified_excel_file_path = None
+if "timeline_history" not in st.session_state:
+    st.session_state.timeline_history = None
+if "exporter" not in st.session_state:
+    st.session_state.exporter = TimelineExporter()  # Exports are only serialized when a download is requested
+
+# Shared OpenAI request queue status
+scheduler_stats = get_scheduler().stats()
+with st.sidebar.expander("OpenAI request queue"):
+    st.metric("Queued requests", scheduler_stats["queue_depth"])
+    st.metric("Waiting sessions", scheduler_stats["waiting_sessions"])
+    st.metric("Average wait (s)", f"{scheduler_stats['avg_wait_sec']:.2f}")
+    st.metric("P95 wait (s)", f"{scheduler_stats['p95_wait_sec']:.2f}")
+    st.caption(f"Admitted: {scheduler_stats['admitted']} | Retries: {scheduler_stats['retries']}")
+
+# Schedule options, applied to the displayed timeline and its exports
+with st.sidebar.expander("Schedule"):
+    schedule_enabled = st.checkbox("Compute start/end dates and critical path")
+    schedule_start_date = st.date_input("Project start date")
+    dependency_mode = st.selectbox("Dependencies", list(DEPENDENCY_MODES), format_func=DEPENDENCY_MODES.get)
+    team_size = st.number_input("Team size (0 for unlimited)", min_value=0, value=0, step=1)
+schedule_options = (schedule_start_date.isoformat(), dependency_mode, int(team_size) or None) if schedule_enabled else None
 
 # File uploader
-uploaded_file = st.file_uploader("Upload a DOCX or PDF file", type=['docx', 'pdf', 'txt'])
-
-# Helper function to remove a file if it exists
-def remove_file(filepath):
-    if filepath and os.path.exists(filepath):
-        os.remove(filepath)
+uploaded_file = st.file_uploader("Upload a DOCX or PDF file", type=['docx', 'pdf', 'txt', 'md', 'html'])
+chunking_mode = st.radio("Chunking", ["Character chunks", "Document sections"], horizontal=True,
+                         help="Document sections follow the headings of the file and are processed in parallel, "
+                              "so an edited document only reprocesses the sections that changed.")
 
 if uploaded_file is not None:
-    if not os.path.exists("user_files"):
-        os.makedirs("user_files")
-    # Remove previously uploaded file and Excel file for this session
-    remove_file(st.session_state.uploaded_file_path)
-    # remove_file(st.session_state.excel_file_path)
-    # Process the file
-    user_file_path = f"user_files/{st.session_state.user_id}_{uploaded_file.name}"  # Unique file name based on user_id
-    # Process the file
-    with open(user_file_path, 'wb') as f:
-        f.write(uploaded_file.getbuffer())
-
-    # Store the uploaded file path in session state
-    st.session_state.uploaded_file_path = user_file_path
-
-    # Split the file into chunks
-    chunks = split_file(user_file_path)
-    
+    # Only a new upload is written to disk; reruns from grid paging, sorting and filtering reuse the saved file
+    if uploaded_file.file_id != st.session_state.uploaded_file_id:
+        # Remove previously uploaded file for this session
+        file_store.remove(st.session_state.user_id, st.session_state.uploaded_file_path)
+        # Save the file in this session's directory
+        st.session_state.uploaded_file_path = file_store.save_file(
+            st.session_state.user_id, uploaded_file.name, uploaded_file.getbuffer()
+        )
+        st.session_state.uploaded_file_id = uploaded_file.file_id
+    user_file_path = st.session_state.uploaded_file_path
+
+    # Stages of an interrupted run are saved per document, so generating again resumes where it stopped
+    start_over = st.checkbox("Start over instead of resuming an interrupted run")
+
     # Generate timeline button
     if st.button("Generate Timeline"):
-        timeline_text = refine_timeline(chunks)
+        # The sweeper may have removed the file while the session was idle
+        if not os.path.exists(user_file_path):
+            user_file_path = file_store.save_file(st.session_state.user_id, uploaded_file.name, uploaded_file.getbuffer())
+            st.session_state.uploaded_file_path = user_file_path
+        if chunking_mode == "Document sections":
+            # Split the file into heading-aligned sections
+            sections = split_file_into_sections(user_file_path)
+            if start_over:
+                for section in sections:
+                    get_checkpoint_store().clear(section_document_hash(section))
+            timeline_text = refine_timeline_sections(sections)
+        else:
+            # Split the file into chunks
+            chunks = split_file(user_file_path)
+            if start_over:
+                get_checkpoint_store().clear(document_hash(chunks))
+            timeline_text = refine_timeline(chunks)
                 
         # Store the generated timeline text in session state
         st.session_state.timeline_text = timeline_text
         st.session_state.updated_timeline_text = timeline_text
-
-        # Save timeline to Excel
-        excel_file_path = process_gpt_timeline_response(timeline_text, st.session_state.user_id)
-        # Store the Excel file path in session state
-        st.session_state.excel_file_path = excel_file_path
-
-if st.session_state.excel_file_path:
-    st.subheader("Generated Timeline:")
-    # Display the Excel content as a DataFrame
-    df = pd.read_excel(st.session_state.excel_file_path)
-    # Create AgGrid options
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_default_column(resizable=True, filterable=False, sortable=False, editable=False)
-    gb.configure_grid_options(domLayout='normal')  # Adjust height based on content
-    grid_options = gb.build()
-
-    # Display the DataFrame using AgGrid with auto-sizing columns
-    AgGrid(df, gridOptions=grid_options, fit_columns_on_grid_load=True, theme="alpine")
-
-    with open(st.session_state.excel_file_path, 'rb') as f:
-        st.download_button(
-            label="Download Timeline as Excel",
-            data=f,
-            file_name='project_timeline.xlsx',
-            mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        st.session_state.timeline_history = TimelineHistory(timeline_text)
+
+# Helper function to display a timeline version
+def show_timeline(timeline_text, key):
+    df, developer_queries_list = st.session_state.exporter.parse(timeline_text)
+    if schedule_options is not None:
+        df, project_duration = st.session_state.exporter.schedule(timeline_text, schedule_options)
+        st.caption(f"Scheduled project duration: {project_duration:g} working days, "
+                   f"{int(df['Critical Path'].sum())} rows on the critical path")
+    render_timeline_grid(df, key=key)
+    st.caption(f"Total: {df['Total Time (Days)'].sum()} days / {df['Total Time (Hours)'].sum()} hours")
+    if developer_queries_list:
+        with st.expander("Developer Side Queries"):
+            st.text("\n".join(developer_queries_list))
+
+# Helper function to offer a timeline version for download, serializing only the requested format
+def show_downloads(timeline_text, file_stem, key, remember_estimates=True):
+    exporter = st.session_state.exporter
+    format_column, prepare_column, download_column = st.columns(3)
+    export_name = format_column.selectbox("Format", list(EXPORT_FORMATS), format_func=lambda name: EXPORT_FORMATS[name].label,
+                                          key=f"{key}_format", label_visibility="collapsed")
+    export_format = EXPORT_FORMATS[export_name]
+    if prepare_column.button(f"Prepare {export_format.label} download", key=f"{key}_prepare"):
+        exporter.export(timeline_text, export_name, schedule_options)
+    if exporter.is_exported(timeline_text, export_name, schedule_options):
+        download_column.download_button(
+            label=f"Download as {export_format.label}",
+            data=exporter.export(timeline_text, export_name, schedule_options),
+            file_name=f"{file_stem}.{export_format.extension}",
+            mime=export_format.mime,
+            key=f"{key}_download",
+            # A downloaded timeline counts as accepted, so its estimates are reused for similar subtasks
+            on_click=get_duration_memory().remember_timeline if remember_estimates else None,
+            args=(timeline_text,) if remember_estimates else None
         )
 
+if st.session_state.updated_timeline_text:
+    # The current timeline is shown once, as the updated timeline after feedback
+    if st.session_state.updated_timeline_text != st.session_state.timeline_text:
+        st.subheader("Updated Timeline:")
+        show_timeline(st.session_state.updated_timeline_text, key="NewTimeline")
+        show_downloads(st.session_state.updated_timeline_text, "updated_project_timeline", key="updated_timeline")
+    else:
+        st.subheader("Generated Timeline:")
+        show_timeline(st.session_state.updated_timeline_text, key="timeline")
+        show_downloads(st.session_state.updated_timeline_text, "project_timeline", key="timeline")
+
 if st.session_state.timeline_text:
     # Feedback Section
     st.subheader("Feedback on Timeline")
@@ -115,50 +174,47 @@ if st.session_state.timeline_text:
 
             # Update the session state with the modified timeline text
             st.session_state.updated_timeline_text = modified_timeline_text
-            # Save the modified timeline to a new Excel file
-            modified_excel_file_path = process_gpt_timeline_response(modified_timeline_text, st.session_state.user_id, feedback=True)
-            st.session_state.excel_file_path = modified_excel_file_path
+            st.session_state.timeline_history.append(modified_timeline_text, label=f"Feedback: {feedback[:40]}")
+            # Rerun so the timeline section above shows the update
+            st.rerun()
         else:
             st.warning("Please provide feedback before updating the timeline.")
 
-        if st.session_state.excel_file_path:
-            st.subheader("Updated Timeline:")
-            # Display the modified Excel content as a DataFrame
-            modified_df = pd.read_excel(st.session_state.excel_file_path)
-            # Create AgGrid options for the modified timeline
-            gb = GridOptionsBuilder.from_dataframe(modified_df)
-            gb.configure_default_column(resizable=True, filterable=False, sortable=False, editable=False)
-            gb.configure_grid_options(domLayout='normal')  # Adjust height based on content
-            modified_grid_options = gb.build()
-
-            # Display the modified DataFrame using AgGrid with auto-sizing columns
-            AgGrid(modified_df, gridOptions=modified_grid_options, fit_columns_on_grid_load=True, theme="alpine", key="NewTimeline")
-
-            with open(st.session_state.excel_file_path, 'rb') as f:
-                st.download_button(
-                    label="Download Updated Timeline as Excel",
-                    data=f,
-                    file_name='updated_project_timeline.xlsx',
-                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
-
-            # Clean up the modified file
-            # os.remove(modified_excel_file_path)
+# Helper function to make an earlier version current again without calling the model
+def revert_to_version(version_number):
+    # Nothing is exported here; show_downloads builds a file only when its download is prepared
+    _, st.session_state.updated_timeline_text = st.session_state.timeline_history.revert(version_number)
+
+if st.session_state.timeline_history and len(st.session_state.timeline_history.versions()) > 1:
+    history = st.session_state.timeline_history
+    version_labels = {number: f"v{number} - {label}" for number, label in history.versions()}
+    version_numbers = list(version_labels)
+
+    st.subheader("Timeline Versions")
+    selected_version = st.selectbox("Version", version_numbers, index=len(version_numbers) - 1,
+                                    format_func=version_labels.get)
+    selected_timeline_text = history.get_text(selected_version)
+    render_timeline_grid(st.session_state.exporter.parse(selected_timeline_text)[0], key="version_grid")
+
+    if selected_version != history.latest_number:
+        st.button("Revert to this version", on_click=revert_to_version, args=(selected_version,))
+
+    show_downloads(selected_timeline_text, f"project_timeline_v{selected_version}", key="version",
+                   remember_estimates=False)
+
+    # Compare two versions row by row
+    compare_from, compare_to = st.columns(2)
+    old_version = compare_from.selectbox("Compare from", version_numbers, index=len(version_numbers) - 2,
+                                         format_func=version_labels.get)
+    new_version = compare_to.selectbox("Compare to", version_numbers, index=len(version_numbers) - 1,
+                                       format_func=version_labels.get)
+    changes = history.compare(old_version, new_version)
+    if changes:
+        st.dataframe(pd.DataFrame(changes), use_container_width=True)
+    else:
+        st.info("No timeline rows differ between these versions.")
 
 # Clean up the uploaded file if needed
 # if st.session_state.uploaded_file_path:
 #     os.remove(st.session_state.uploaded_file_path)
 #     st.session_state.uploaded_file_path = None
-
-# if st.session_state.excel_file_path:
-#     os.remove(st.session_state.excel_file_path)
-#     st.session_state.excel_file_path = None
-
-# Periodic cleanup of old files (e.g., files older than 1 hour)
-def cleanup_old_files(directory, age_threshold_sec=3600):
-    for filepath in glob.glob(f"{directory}/*"):
-        if os.path.isfile(filepath) and time.time() - os.path.getmtime(filepath) > age_threshold_sec:
-            os.remove(filepath)
-
-# Run the cleanup function (customize directory as needed)
-cleanup_old_files(directory="user_files", age_threshold_sec=3600)  # Customize age threshold as needed
@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DB_PATH = os.getenv("PIPELINE_CHECKPOINT_DB") or "pipeline_checkpoints.db"
+# Checkpoints older than this are deleted, so the store only holds recent runs
+PIPELINE_CHECKPOINT_TTL_SEC = int(os.getenv("PIPELINE_CHECKPOINT_TTL_SEC") or 86400)
+
+
+def document_hash(requirement_chunks):
+    """
+    Returns the hash identifying a document's requirement chunks in the checkpoint store.
+    """
+    digest = hashlib.sha256()
+    for chunk in requirement_chunks:
+        digest.update(str(chunk).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """
+    Durable store of pipeline stage outputs keyed by document hash, pipeline version and stage name.
+
+    A run is begun before its stages and finished once it returns. While a run is unfinished, a
+    stage that already has a checkpoint is not run again, so an interrupted pipeline resumes after
+    its last completed stage. Beginning a finished run again discards its checkpoints and starts
+    over. A different pipeline version (model, prompts, settings) is a separate run. Checkpoints
+    older than `ttl_sec` are deleted. Stage timings are kept for offline profiling.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, ttl_sec=PIPELINE_CHECKPOINT_TTL_SEC):
+        self.db_path = db_path
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "doc_hash TEXT, pipeline TEXT, done INTEGER, started_at REAL, updated_at REAL, "
+                "PRIMARY KEY (doc_hash, pipeline))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stages ("
+                "doc_hash TEXT, pipeline TEXT, stage TEXT, seq INTEGER, output TEXT, elapsed_sec REAL, created_at REAL, "
+                "PRIMARY KEY (doc_hash, pipeline, stage))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_updated_at ON runs (updated_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def purge(self, now=None):
+        """
+        Deletes the runs and stage checkpoints not updated within the TTL.
+        """
+        cutoff = (time.time() if now is None else now) - self.ttl_sec
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute(
+                    "DELETE FROM stages WHERE (doc_hash, pipeline) IN "
+                    "(SELECT doc_hash, pipeline FROM runs WHERE updated_at < ?)", (cutoff,)
+                )
+                conn.execute("DELETE FROM runs WHERE updated_at < ?", (cutoff,))
+                # Stages left without a run, e.g. from a run cleared while it was saving
+                conn.execute(
+                    "DELETE FROM stages WHERE (doc_hash, pipeline) NOT IN (SELECT doc_hash, pipeline FROM runs)"
+                )
+
+    def begin(self, doc_hash, pipeline="", reuse_finished=False, purge=True):
+        """
+        Starts or resumes a run. A finished run's checkpoints are discarded so it runs again,
+        unless `reuse_finished` is set. Expired runs are purged first unless `purge` is off,
+        e.g. when the caller purged once before beginning several runs.
+
+        Returns:
+            bool: Whether an earlier run's checkpoints are reused.
+        """
+        if purge:
+            self.purge()
+        now = time.time()
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT done FROM runs WHERE doc_hash = ? AND pipeline = ?", (doc_hash, pipeline)
+                ).fetchone()
+                if row is not None and (not row[0] or reuse_finished):
+                    conn.execute(
+                        "UPDATE runs SET updated_at = ? WHERE doc_hash = ? AND pipeline = ?", (now, doc_hash, pipeline)
+                    )
+                    return True
+                conn.execute("DELETE FROM stages WHERE doc_hash = ? AND pipeline = ?", (doc_hash, pipeline))
+                conn.execute(
+                    "INSERT OR REPLACE INTO runs (doc_hash, pipeline, done, started_at, updated_at) VALUES (?, ?, 0, ?, ?)",
+                    (doc_hash, pipeline, now, now),
+                )
+                return False
+
+    def finish(self, doc_hash, pipeline=""):
+        """
+        Marks a run as finished, so its checkpoints are no longer resumed.
+        """
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE runs SET done = 1, updated_at = ? WHERE doc_hash = ? AND pipeline = ?",
+                    (time.time(), doc_hash, pipeline),
+                )
+
+    def load(self, doc_hash, stage, pipeline=""):
+        """
+        Returns:
+            tuple: (found, output) for the stage's checkpoint.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT output FROM stages WHERE doc_hash = ? AND pipeline = ? AND stage = ?", (doc_hash, pipeline, stage)
+            ).fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def save(self, doc_hash, stage, output, elapsed_sec, pipeline=""):
+        now = time.time()
+        with self._lock:
+            with self._connect() as conn:
+                seq = conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM stages WHERE doc_hash = ? AND pipeline = ?", (doc_hash, pipeline)
+                ).fetchone()[0]
+                conn.execute(
+                    "INSERT OR REPLACE INTO stages (doc_hash, pipeline, stage, seq, output, elapsed_sec, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (doc_hash, pipeline, stage, seq, output, elapsed_sec, now),
+                )
+                conn.execute(
+                    "UPDATE runs SET updated_at = ? WHERE doc_hash = ? AND pipeline = ?", (now, doc_hash, pipeline)
+                )
+
+    def run(self, doc_hash, stage, func, *args, pipeline="", reuse=True):
+        """
+        Returns the checkpointed output of a stage, running and checkpointing it if there is none.
+        With `reuse` off the stage always runs and only its output and timing are recorded.
+        """
+        if reuse:
+            found, output = self.load(doc_hash, stage, pipeline)
+            if found:
+                return output
+        started = time.perf_counter()
+        output = func(*args)
+        self.save(doc_hash, stage, output, time.perf_counter() - started, pipeline)
+        return output
+
+    def stages(self, doc_hash):
+        """
+        Lists a document's checkpoints in the order they were completed.
+
+        Returns:
+            list: (pipeline, stage, output, elapsed_sec, created_at) tuples.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT pipeline, stage, output, elapsed_sec, created_at FROM stages WHERE doc_hash = ? "
+                "ORDER BY pipeline, seq",
+                (doc_hash,),
+            ).fetchall()
+
+    def documents(self):
+        """
+        Lists the runs as (doc_hash, pipeline, done, stage count, total elapsed seconds, last update).
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT runs.doc_hash, runs.pipeline, runs.done, COUNT(stages.stage), SUM(stages.elapsed_sec), runs.updated_at "
+                "FROM runs LEFT JOIN stages ON stages.doc_hash = runs.doc_hash AND stages.pipeline = runs.pipeline "
+                "GROUP BY runs.doc_hash, runs.pipeline ORDER BY runs.updated_at DESC"
+            ).fetchall()
+
+    def clear(self, doc_hash):
+        """
+        Deletes every run of a document, whatever its pipeline version.
+        """
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM stages WHERE doc_hash = ?", (doc_hash,))
+                conn.execute("DELETE FROM runs WHERE doc_hash = ?", (doc_hash,))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store():
+    """
+    Returns the CheckpointStore shared by all sessions.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore()
+        return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect saved refine_timeline stage checkpoints.")
+    parser.add_argument("doc_hash", nargs="?", help="Show the stages of this document instead of listing runs.")
+    parser.add_argument("--stage", help="Print the saved output of this stage.")
+    args = parser.parse_args()
+
+    store = get_checkpoint_store()
+    if args.doc_hash is None:
+        for doc_hash, pipeline, done, stage_count, elapsed_sec, updated_at in store.documents():
+            status = "done" if done else "unfinished"
+            print(f"{doc_hash}  {pipeline}  {status:<10} {stage_count:>3} stages  {elapsed_sec or 0:8.1f} s  "
+                  f"{time.ctime(updated_at)}")
+    else:
+        for pipeline, stage, output, elapsed_sec, _ in store.stages(args.doc_hash):
+            if args.stage is None:
+                print(f"{pipeline}  {stage:<14} {elapsed_sec:8.2f} s  {len(output or '')} chars")
+            elif stage == args.stage:
+                print(output if output is not None else "(none)")
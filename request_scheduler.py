@@ -0,0 +1,277 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+import backoff
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE") or 500)
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE") or 200000)
+# Retries after the first attempt
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES") or 5)
+
+# 429s, dropped connections, timeouts and 5xx responses are retried; other errors are raised immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_current_session = contextvars.ContextVar("scheduler_session", default="default")
+
+
+def set_session(session_id):
+    """
+    Sets the session that completion calls made from the current thread are queued under.
+    """
+    _current_session.set(session_id)
+
+
+def get_session():
+    return _current_session.get()
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """
+    Roughly estimates the tokens a request will use (about four characters per token).
+
+    Args:
+        messages (list): The chat messages of the request.
+        max_tokens (int): The completion token limit of the request.
+
+    Returns:
+        int: Estimated prompt plus completion tokens.
+    """
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages or [])
+    return prompt_chars // 4 + int(max_tokens or 0)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `capacity_per_minute` per minute.
+    """
+
+    def __init__(self, capacity_per_minute):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        # Requests larger than the bucket are let through once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+    def adjust(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RequestScheduler:
+    """
+    Process-wide scheduler that admits completion calls under request and token rate limits.
+
+    Waiting calls are queued per session and sessions are served round-robin, so one
+    session's batch of calls cannot starve another session's interactive calls.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self._cond = threading.Condition()
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+        # session_id -> deque of waiting tickets, kept in round-robin order
+        self._queues = OrderedDict()
+        self._wait_times = deque(maxlen=500)
+        self._admitted = 0
+        self._retries = 0
+        # Admission is held back until this time after a 429 with a Retry-After header
+        self._paused_until = 0.0
+
+    def _next_ticket(self):
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _remove_ticket(self, session_id, ticket):
+        queue = self._queues.get(session_id)
+        if queue is None:
+            return
+        queue.remove(ticket)
+        if queue:
+            # The session goes to the back of the line after each admitted call
+            self._queues.move_to_end(session_id)
+        else:
+            del self._queues[session_id]
+
+    def acquire(self, session_id, estimated_tokens):
+        """
+        Blocks until the call is at the front of the fair queue and both rate limits allow it.
+
+        Returns:
+            float: Seconds spent waiting in the queue.
+        """
+        ticket = object()
+        enqueued_at = time.monotonic()
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            try:
+                while True:
+                    if self._next_ticket() is ticket:
+                        now = time.monotonic()
+                        delay = max(
+                            self._paused_until - now,
+                            self._request_bucket.wait_time(1, now),
+                            self._token_bucket.wait_time(estimated_tokens, now),
+                        )
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._remove_ticket(session_id, ticket)
+                self._cond.notify_all()
+
+            now = time.monotonic()
+            self._request_bucket.consume(1, now)
+            self._token_bucket.consume(estimated_tokens, now)
+            waited = now - enqueued_at
+            self._wait_times.append(waited)
+            self._admitted += 1
+            return waited
+
+    def settle(self, estimated_tokens, used_tokens):
+        """
+        Corrects the token bucket once the actual usage of an admitted call is known.
+        """
+        with self._cond:
+            self._token_bucket.adjust(estimated_tokens - used_tokens)
+            self._cond.notify_all()
+
+    def refund(self, estimated_tokens):
+        """
+        Returns the token reservation of a call that failed before it was charged.
+        """
+        self.settle(estimated_tokens, 0)
+
+    def pause(self, seconds):
+        """
+        Holds back all admissions for `seconds`, as asked by the API's Retry-After header.
+        """
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def record_retry(self, details=None):
+        with self._cond:
+            self._retries += 1
+
+    def stats(self):
+        """
+        Returns the current queue depth and wait time statistics.
+        """
+        with self._cond:
+            waits = sorted(self._wait_times)
+            return {
+                "queue_depth": sum(len(queue) for queue in self._queues.values()),
+                "waiting_sessions": len(self._queues),
+                "queue_depth_by_session": {session_id: len(queue) for session_id, queue in self._queues.items()},
+                "admitted": self._admitted,
+                "retries": self._retries,
+                "avg_wait_sec": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait_sec": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max_wait_sec": waits[-1] if waits else 0.0,
+            }
+
+
+def retry_after_seconds(error):
+    """
+    Reads the Retry-After delay of a rate limit error.
+
+    Returns:
+        float: The delay in seconds, or None when the response does not give one.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers.get(header)) * scale
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the RequestScheduler shared by every session of the server process.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
+
+
+def create_chat_completion(client, **kwargs):
+    """
+    Sends a chat completion through the shared scheduler, retrying 429 and 5xx errors
+    with jittered exponential backoff up to OPENAI_MAX_RETRIES times. A 429's Retry-After
+    delay holds back every session's calls, since the rate limit is shared.
+
+    Args:
+        client (OpenAI): The OpenAI client to send the request with.
+        **kwargs: Arguments for `client.chat.completions.create`.
+
+    Returns:
+        ChatCompletion: The completion response.
+    """
+    scheduler = get_scheduler()
+    session_id = get_session()
+    estimated = estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens"))
+
+    @backoff.on_exception(
+        backoff.expo,
+        RETRYABLE_ERRORS,
+        max_tries=MAX_RETRIES + 1,
+        max_value=60,
+        jitter=backoff.full_jitter,
+        on_backoff=scheduler.record_retry,
+    )
+    def send():
+        # Every attempt, including retries, goes back through the fair queue
+        scheduler.acquire(session_id, estimated)
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as error:
+            # A failed attempt is not charged, so its reservation goes back to the bucket
+            scheduler.refund(estimated)
+            if isinstance(error, openai.RateLimitError):
+                delay = retry_after_seconds(error)
+                if delay:
+                    scheduler.pause(delay)
+            raise
+        usage = getattr(response, "usage", None)
+        if usage is not None and usage.total_tokens is not None:
+            scheduler.settle(estimated, usage.total_tokens)
+        return response
+
+    return send()
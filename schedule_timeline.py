@@ -0,0 +1,337 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+DAYS_COLUMN = 'Total Time (Days)'
+SCHEDULE_COLUMNS = ['Start Day', 'End Day', 'Start Date', 'End Date', 'Slack (Days)', 'Critical Path']
+
+# Dependency modes used when no explicit dependencies are given
+DEPENDENCY_MODES = {
+    "phases": "Phases in sequence, subtasks of a task in sequence",
+    "sequential": "Every row in sequence",
+    "parallel": "No dependencies",
+}
+
+
+def default_dependencies(df, mode="phases"):
+    """
+    Builds the dependency edges between timeline rows for a dependency mode.
+
+    In 'phases' mode every row of a phase waits for the whole previous phase, through one
+    zero-duration milestone node per phase boundary so the edge count stays linear.
+
+    Args:
+        df (DataFrame): The timeline with 'Phase' and 'Task' columns.
+        mode (str): One of DEPENDENCY_MODES.
+
+    Returns:
+        tuple: (predecessors, successors, n_milestones). Node ids at or above len(df) are milestones.
+    """
+    n_rows = len(df)
+    if mode == "parallel" or n_rows < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+    if mode == "sequential":
+        rows = np.arange(n_rows, dtype=np.int64)
+        return rows[:-1], rows[1:], 0
+    if mode != "phases":
+        raise ValueError(f"Unknown dependency mode: {mode}")
+
+    phase = pd.factorize(df['Phase'].astype(str), sort=False)[0]
+    task = pd.factorize(df['Phase'].astype(str) + '\x00' + df['Task'].astype(str), sort=False)[0]
+    rows = np.arange(n_rows, dtype=np.int64)
+
+    # Consecutive subtasks of the same task run one after another
+    same_task = task[1:] == task[:-1]
+    predecessors = [rows[:-1][same_task]]
+    successors = [rows[1:][same_task]]
+
+    # Each phase boundary gets a milestone: all rows of phase k -> milestone k -> all rows of phase k + 1
+    n_phases = phase.max() + 1
+    milestones = n_rows + np.arange(max(n_phases - 1, 0), dtype=np.int64)
+    before_boundary = phase < n_phases - 1
+    predecessors.append(rows[before_boundary])
+    successors.append(milestones[phase[before_boundary]])
+    after_boundary = phase > 0
+    predecessors.append(milestones[phase[after_boundary] - 1])
+    successors.append(rows[after_boundary])
+    return np.concatenate(predecessors), np.concatenate(successors), len(milestones)
+
+
+# Level-by-level array passes pay a fixed cost per level, so deep and narrow graphs
+# (long chains) are handed to a single scalar pass once this many narrow levels are seen
+NARROW_LEVEL_SIZE = 16
+MAX_NARROW_LEVELS = 256
+
+
+def _successor_csr(n_nodes, predecessors, successors):
+    # CSR adjacency of the successors of every node
+    order = np.argsort(predecessors, kind='stable')
+    targets = successors[order]
+    offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(predecessors, minlength=n_nodes), out=offsets[1:])
+    return offsets, targets
+
+
+def _topological_levels(n_nodes, offsets, targets, indegree):
+    """
+    Groups the nodes into topological levels with array operations.
+
+    Returns:
+        list: The node arrays of every level, or None when the graph is too deep for level passes.
+    """
+    levels = []
+    narrow_levels = 0
+    frontier = np.flatnonzero(indegree == 0)
+    indegree = indegree.copy()
+    while frontier.size:
+        levels.append(frontier)
+        if frontier.size < NARROW_LEVEL_SIZE:
+            narrow_levels += 1
+            if narrow_levels > MAX_NARROW_LEVELS:
+                return None
+        edge_idx = _edges_of(frontier, offsets)
+        if not edge_idx.size:
+            break
+        frontier_targets = targets[edge_idx]
+        np.subtract.at(indegree, frontier_targets, 1)
+        frontier = np.unique(frontier_targets[indegree[frontier_targets] == 0])
+
+    if sum(level.size for level in levels) != n_nodes:
+        raise ValueError("The timeline dependencies contain a cycle")
+    return levels
+
+
+def _critical_path_levels(durations, offsets, targets, levels):
+    n_nodes = len(durations)
+
+    # Forward pass: earliest start is the latest finish of all predecessors
+    earliest_start = np.zeros(n_nodes)
+    for level in levels:
+        edge_idx = _edges_of(level, offsets)
+        if edge_idx.size:
+            sources = _edge_sources(level, offsets)
+            np.maximum.at(earliest_start, targets[edge_idx], earliest_start[sources] + durations[sources])
+    project_duration = (earliest_start + durations).max()
+
+    # Backward pass: latest finish is the earliest latest-start of all successors
+    latest_finish = np.full(n_nodes, project_duration)
+    for level in reversed(levels):
+        edge_idx = _edges_of(level, offsets)
+        if edge_idx.size:
+            sources = _edge_sources(level, offsets)
+            edge_targets = targets[edge_idx]
+            np.minimum.at(latest_finish, sources, latest_finish[edge_targets] - durations[edge_targets])
+    return earliest_start, latest_finish
+
+
+def _critical_path_scalar(durations, offsets, targets, indegree):
+    n_nodes = len(durations)
+    durations_list = durations.tolist()
+    offsets_list = offsets.tolist()
+    targets_list = targets.tolist()
+    remaining = indegree.tolist()
+    earliest_start = [0.0] * n_nodes
+
+    # Kahn's algorithm with the forward pass folded in
+    order = [node for node in range(n_nodes) if remaining[node] == 0]
+    for node in order:
+        node_finish = earliest_start[node] + durations_list[node]
+        for edge in range(offsets_list[node], offsets_list[node + 1]):
+            target = targets_list[edge]
+            if node_finish > earliest_start[target]:
+                earliest_start[target] = node_finish
+            remaining[target] -= 1
+            if remaining[target] == 0:
+                order.append(target)
+    if len(order) != n_nodes:
+        raise ValueError("The timeline dependencies contain a cycle")
+
+    project_duration = max(start + duration for start, duration in zip(earliest_start, durations_list))
+    latest_finish = [project_duration] * n_nodes
+    for node in reversed(order):
+        node_finish = latest_finish[node]
+        for edge in range(offsets_list[node], offsets_list[node + 1]):
+            target = targets_list[edge]
+            target_start = latest_finish[target] - durations_list[target]
+            if target_start < node_finish:
+                node_finish = target_start
+        latest_finish[node] = node_finish
+    return np.array(earliest_start), np.array(latest_finish)
+
+
+def _edges_of(nodes, offsets):
+    # Positions in the CSR target array of all outgoing edges of `nodes`
+    counts = offsets[nodes + 1] - offsets[nodes]
+    total = counts.sum()
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    starts = np.repeat(offsets[nodes] - np.cumsum(counts) + counts, counts)
+    return starts + np.arange(total)
+
+
+def _edge_sources(nodes, offsets):
+    return np.repeat(nodes, offsets[nodes + 1] - offsets[nodes])
+
+
+def compute_schedule(durations, predecessors, successors, team_size=None):
+    """
+    Computes the critical path schedule of a dependency graph.
+
+    Nodes are processed one topological level at a time with vectorized forward and backward
+    passes, so wide graphs cost a few array operations per level rather than per node. Deep,
+    narrow graphs fall back to a single scalar pass over the topological order.
+
+    Args:
+        durations (ndarray): Duration of every node in working days.
+        predecessors (ndarray): Source node of every dependency edge.
+        successors (ndarray): Target node of every dependency edge.
+        team_size (int): Number of rows that can be worked on at the same time, None for unlimited.
+            With a team size, slack is how far a node can slip without delaying the capacity-limited
+            schedule, keeping the order in which team members pick up their rows.
+
+    Returns:
+        dict: Arrays 'start', 'finish', 'slack' and 'critical' and the float 'project_duration'.
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    predecessors = np.asarray(predecessors, dtype=np.int64)
+    successors = np.asarray(successors, dtype=np.int64)
+    n_nodes = len(durations)
+    if not n_nodes:
+        empty = np.empty(0)
+        return {"start": empty, "finish": empty, "slack": empty, "critical": empty.astype(bool), "project_duration": 0.0}
+
+    offsets, targets = _successor_csr(n_nodes, predecessors, successors)
+    indegree = np.bincount(successors, minlength=n_nodes)
+    levels = _topological_levels(n_nodes, offsets, targets, indegree)
+    if levels is None:
+        earliest_start, latest_finish = _critical_path_scalar(durations, offsets, targets, indegree)
+    else:
+        earliest_start, latest_finish = _critical_path_levels(durations, offsets, targets, levels)
+    earliest_finish = earliest_start + durations
+    project_duration = earliest_finish.max()
+    slack = latest_finish - earliest_finish
+    critical = np.isclose(slack, 0.0, atol=1e-9)
+
+    start, finish = earliest_start, earliest_finish
+    if team_size:
+        # Slack and the critical path are taken from the capacity-limited schedule that is reported
+        start, finish, latest_finish = _level_resources(durations, offsets, targets, indegree, slack, earliest_start, team_size)
+        project_duration = finish.max()
+        slack = latest_finish - finish
+        critical = np.isclose(slack, 0.0, atol=1e-9)
+
+    return {
+        "start": start,
+        "finish": finish,
+        "slack": slack,
+        "critical": critical,
+        "project_duration": float(project_duration),
+    }
+
+
+def _level_resources(durations, offsets, targets, indegree, slack, earliest_start, team_size):
+    """
+    List scheduling under a team capacity: ready nodes are started in order of least slack
+    on the next free team member. Zero-duration nodes (milestones) take no capacity.
+
+    The latest finish of every node is then found with a backward pass over both the dependency
+    edges and the hand-over edges from each row to the next row its team member picked up.
+
+    Returns:
+        tuple: Arrays of the start, finish and latest finish of every node.
+    """
+    n_nodes = len(durations)
+    offsets = offsets.tolist()
+    targets = targets.tolist()
+    remaining = indegree.tolist()
+    durations_list = durations.tolist()
+    slack_list = slack.tolist()
+    priority_start = earliest_start.tolist()
+
+    ready_time = [0.0] * n_nodes
+    start = [0.0] * n_nodes
+    finish = [0.0] * n_nodes
+    handed_over_to = [-1] * n_nodes
+    ready = [(slack_list[node], priority_start[node], node) for node in range(n_nodes) if remaining[node] == 0]
+    heapq.heapify(ready)
+    # (free_at, member, last row of the member)
+    team = [(0.0, member, -1) for member in range(team_size)]
+    order = []
+
+    while ready:
+        _, _, node = heapq.heappop(ready)
+        order.append(node)
+        if durations_list[node] > 0:
+            free_at, member, previous = heapq.heappop(team)
+            if previous >= 0:
+                handed_over_to[previous] = node
+            start[node] = max(ready_time[node], free_at)
+            finish[node] = start[node] + durations_list[node]
+            heapq.heappush(team, (finish[node], member, node))
+        else:
+            start[node] = finish[node] = ready_time[node]
+        for edge in range(offsets[node], offsets[node + 1]):
+            target = targets[edge]
+            if finish[node] > ready_time[target]:
+                ready_time[target] = finish[node]
+            remaining[target] -= 1
+            if remaining[target] == 0:
+                heapq.heappush(ready, (slack_list[target], priority_start[target], target))
+
+    # Rows were started in topological order of both edge kinds, so the reverse order is a valid backward pass
+    project_duration = max(finish)
+    latest_finish = [project_duration] * n_nodes
+    for node in reversed(order):
+        node_finish = latest_finish[node]
+        successors = [targets[edge] for edge in range(offsets[node], offsets[node + 1])]
+        if handed_over_to[node] >= 0:
+            successors.append(handed_over_to[node])
+        for target in successors:
+            target_start = latest_finish[target] - durations_list[target]
+            if target_start < node_finish:
+                node_finish = target_start
+        latest_finish[node] = node_finish
+    return np.array(start), np.array(finish), np.array(latest_finish)
+
+
+def schedule_timeline(df, start_date=None, dependencies=None, dependency_mode="phases", team_size=None):
+    """
+    Adds start/end days and dates, slack and critical path columns to a timeline.
+
+    Args:
+        df (DataFrame): The timeline with 'Phase', 'Task' and 'Total Time (Days)' columns.
+        start_date (date): The project start date, today when not given. Dates skip weekends.
+        dependencies (list): (predecessor_row, successor_row) positional row pairs, overriding the dependency mode.
+        dependency_mode (str): One of DEPENDENCY_MODES, used when no dependencies are given.
+        team_size (int): Number of rows that can be worked on at the same time, None for unlimited.
+
+    Returns:
+        tuple: The timeline with the schedule columns and the project duration in working days.
+    """
+    n_rows = len(df)
+    durations = pd.to_numeric(df[DAYS_COLUMN], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=np.float64)
+    if dependencies is not None:
+        edges = np.asarray(dependencies, dtype=np.int64).reshape(-1, 2)
+        predecessors, successors, n_milestones = edges[:, 0], edges[:, 1], 0
+    else:
+        predecessors, successors, n_milestones = default_dependencies(df, dependency_mode)
+    durations = np.concatenate([durations, np.zeros(n_milestones)])
+
+    schedule = compute_schedule(durations, predecessors, successors, team_size=team_size)
+    start = schedule["start"][:n_rows]
+    finish = schedule["finish"][:n_rows]
+
+    # Working day offsets to calendar dates, a row ends on the last working day it occupies
+    first_day = np.datetime64(pd.Timestamp(start_date or pd.Timestamp.today()).date(), 'D')
+    first_day = np.busday_offset(first_day, 0, roll='forward')
+    start_offsets = np.floor(start).astype(np.int64)
+    end_offsets = np.maximum(np.ceil(finish).astype(np.int64) - 1, start_offsets)
+
+    scheduled = df.copy()
+    scheduled['Start Day'] = start
+    scheduled['End Day'] = finish
+    scheduled['Start Date'] = np.busday_offset(first_day, start_offsets)
+    scheduled['End Date'] = np.busday_offset(first_day, end_offsets)
+    scheduled['Slack (Days)'] = schedule["slack"][:n_rows]
+    scheduled['Critical Path'] = schedule["critical"][:n_rows]
+    return scheduled, schedule["project_duration"]
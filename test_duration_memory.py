@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+# generate_final_timeline builds its OpenAI client at import time
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import generate_final_timeline
+from duration_memory import DurationMemory
+from generate_final_timeline import evaluate_durations, generate_durations_with_memory, merge_duration_rows
+
+TIMELINE = "Phase,Task,Subtask\nBuild,API,Login endpoint\nBuild,API,Logout endpoint\nShip,Deploy,Docker image"
+ROWS = [["Build", "API", "Login endpoint"], ["Build", "API", "Logout endpoint"], ["Ship", "Deploy", "Docker image"]]
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return DurationMemory(db_path=str(tmp_path / "memory.db"), threshold=0.85)
+
+
+class FixedMemory:
+    def __init__(self, estimates):
+        self.estimates = estimates
+
+    def lookup_many(self, rows):
+        return self.estimates
+
+
+def test_lookup_hits_similar_and_misses_different_subtasks(memory):
+    memory.remember([["Build", "API", "Login endpoint", "2", "16"]])
+    days, hours, score = memory.lookup("API", "Login endpoints")
+    assert (days, hours) == (2, 16)
+    assert score >= memory.threshold
+    assert memory.lookup("Deploy", "Kubernetes cluster") is None
+
+
+def test_lookup_threshold_is_inclusive(tmp_path):
+    memory = DurationMemory(db_path=str(tmp_path / "memory.db"), threshold=1.0)
+    memory.remember([["Build", "API", "Login endpoint", "2", "16"]])
+    assert memory.lookup("API", "Login endpoint") is not None
+    assert memory.lookup("API", "Login endpoints") is None
+
+
+def test_remember_updates_the_index_incrementally(memory):
+    assert memory.lookup("API", "Login endpoint") is None
+    memory.remember([["Build", "API", "Login endpoint", "2", "16"]])
+    assert memory.lookup("API", "Login endpoint")[:2] == (2, 16)
+    # A new estimate for the same subtask replaces the old one
+    memory.remember([["Build", "API", "Login endpoint", "3", "24"]])
+    assert memory.lookup("API", "Login endpoint")[:2] == (3, 24)
+
+
+def test_stored_estimates_are_loaded_by_a_new_instance(memory):
+    memory.remember([["Build", "API", "Login endpoint", "2", "16"]])
+    reloaded = DurationMemory(db_path=memory.db_path, threshold=memory.threshold)
+    assert reloaded.lookup("API", "Login endpoint")[:2] == (2, 16)
+
+
+def test_merge_keeps_the_original_row_order():
+    estimates = [None, (1, 8, 0.9), None]
+    generated = [["2", "Ship", "Deploy", "Docker image", "3", "24"], ["0", "Build", "API", "Login", "2", "16"]]
+    assert merge_duration_rows(ROWS, estimates, generated) == [
+        ["Build", "API", "Login endpoint", "2", "16"],
+        ["Build", "API", "Logout endpoint", "1", "8"],
+        ["Ship", "Deploy", "Docker image", "3", "24"],
+    ]
+
+
+@pytest.mark.parametrize("generated", [
+    [["0", "Build", "API", "Login endpoint", "2", "16"]],
+    [["0", "Build", "API", "Login endpoint", "2", "16"], ["0", "Ship", "Deploy", "Docker image", "3", "24"]],
+    [["0", "Build", "API", "Login endpoint", "2", "16"], ["two", "Ship", "Deploy", "Docker image", "3", "24"]],
+    [["0", "Build", "API", "Login endpoint", "2", "16"], ["1", "Build", "API", "Logout endpoint", "1", "8"],
+     ["2", "Ship", "Deploy", "Docker image", "3", "24"]],
+], ids=["dropped", "duplicated", "non-numeric", "unexpected"])
+def test_merge_rejects_row_numbers_that_do_not_line_up(generated):
+    assert merge_duration_rows(ROWS, [None, (1, 8, 0.9), None], generated) is None
+
+
+def test_only_unmatched_rows_are_sent_to_the_model(monkeypatch):
+    sent = []
+    monkeypatch.setattr(generate_final_timeline, "get_duration_memory", lambda: FixedMemory([None, (1, 8, 0.9), None]))
+    monkeypatch.setattr(generate_final_timeline, "generate_durations_for_rows", lambda rows_csv: sent.append(rows_csv) or
+                        "Row,Phase,Task,Subtask,Total Time (Days),Total Time (Hours)\n0,Build,API,Login endpoint,2,16\n"
+                        "2,Ship,Deploy,Docker image,3,24")
+    timeline, used_model = generate_durations_with_memory(TIMELINE)
+    assert used_model
+    assert sent == ["Row,Phase,Task,Subtask\n0,Build,API,Login endpoint\n2,Ship,Deploy,Docker image"]
+    assert timeline.splitlines()[1:] == ["Build,API,Login endpoint,2,16", "Build,API,Logout endpoint,1,8",
+                                         "Ship,Deploy,Docker image,3,24"]
+
+
+def test_dropped_row_falls_back_to_the_full_model_path(monkeypatch):
+    monkeypatch.setattr(generate_final_timeline, "get_duration_memory", lambda: FixedMemory([None, (1, 8, 0.9), None]))
+    monkeypatch.setattr(generate_final_timeline, "generate_durations_for_rows", lambda rows_csv:
+                        "Row,Phase,Task,Subtask,Total Time (Days),Total Time (Hours)\n0,Build,API,Login endpoint,2,16")
+    monkeypatch.setattr(generate_final_timeline, "generate_durations_for_timeline", lambda text: "full model timeline")
+    monkeypatch.setattr(generate_final_timeline, "validate_timeline_for_durations", lambda text: None)
+
+    assert generate_durations_with_memory(TIMELINE) == (None, True)
+    assert evaluate_durations(TIMELINE) == "full model timeline"
+
+
+def test_all_rows_matched_needs_no_model_call(monkeypatch):
+    monkeypatch.setattr(generate_final_timeline, "get_duration_memory", lambda: FixedMemory([(2, 16, 1.0), (1, 8, 0.9), (3, 24, 0.95)]))
+    monkeypatch.setattr(generate_final_timeline, "generate_durations_for_rows", lambda rows_csv: pytest.fail("model called"))
+    monkeypatch.setattr(generate_final_timeline, "validate_timeline_for_durations", lambda text: pytest.fail("model called"))
+    timeline = evaluate_durations(TIMELINE)
+    assert timeline.splitlines()[1:] == ["Build,API,Login endpoint,2,16", "Build,API,Logout endpoint,1,8",
+                                         "Ship,Deploy,Docker image,3,24"]
+
+
+def test_no_local_match_uses_the_full_model_path(monkeypatch):
+    monkeypatch.setattr(generate_final_timeline, "get_duration_memory", lambda: FixedMemory([None, None, None]))
+    assert generate_durations_with_memory(TIMELINE) == (None, False)
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+import file_store
+from file_store import LEGACY_SESSION, TOMBSTONE_PREFIX, SessionFileStore
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(file_store.time, "time", clock)
+    return clock
+
+
+def make_store(tmp_path, ttl_sec=60, quota_bytes=1024):
+    return SessionFileStore(root=str(tmp_path / "user_files"), ttl_sec=ttl_sec, quota_bytes=quota_bytes)
+
+
+def test_idle_session_is_evicted_after_the_ttl(tmp_path, clock):
+    store = make_store(tmp_path)
+    path = store.save_file("alice", "spec.docx", b"12345")
+
+    clock.now += 59
+    assert store.sweep() == 0
+    assert os.path.exists(path)
+
+    clock.now += 2
+    assert store.sweep() == 1
+    assert not os.path.exists(os.path.dirname(path))
+    assert store.stats()["sessions"] == 0
+    assert store.stats()["total_bytes"] == 0
+
+
+def test_session_touched_after_scheduling_is_rescheduled(tmp_path, clock):
+    store = make_store(tmp_path)
+    path = store.save_file("alice", "spec.docx", b"12345")
+
+    clock.now += 50
+    store.touch("alice")
+    # The original expiry has passed, but the session was used since
+    clock.now += 20
+    assert store.sweep() == 0
+    assert os.path.exists(path)
+
+    clock.now += 41
+    assert store.sweep() == 1
+    assert not os.path.exists(path)
+
+
+def test_least_recently_used_session_is_evicted_over_quota(tmp_path, clock):
+    store = make_store(tmp_path, quota_bytes=10)
+    old_path = store.save_file("alice", "spec.docx", b"12345678")
+    clock.now += 1
+    new_path = store.save_file("bob", "spec.docx", b"12345678")
+
+    assert store.sweep() == 1
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path)
+    assert store.stats()["total_bytes"] == 8
+
+
+def test_legacy_flat_files_are_tracked_and_expired(tmp_path, clock):
+    root = tmp_path / "user_files"
+    root.mkdir()
+    legacy_path = root / "abc_project_timeline.xlsx"
+    legacy_path.write_bytes(b"1234")
+    os.utime(legacy_path, (clock.now, clock.now))
+
+    store = make_store(tmp_path)
+    assert store.stats() == {"sessions": 1, "total_bytes": 4, "quota_bytes": 1024}
+    assert LEGACY_SESSION in store._last_access
+
+    clock.now += 61
+    assert store.sweep() == 1
+    assert not legacy_path.exists()
+
+
+def test_upload_after_eviction_survives_the_pending_delete(tmp_path, clock):
+    store = make_store(tmp_path)
+    store.save_file("alice", "old.docx", b"old")
+
+    # Eviction happens under the lock, the delete after it is released
+    with store._lock:
+        pending = store._evict("alice")
+    new_path = store.save_file("alice", "new.docx", b"new")
+    store._delete(pending)
+
+    assert os.path.exists(new_path)
+    assert store.stats()["total_bytes"] == 3
+    assert not any(name.startswith(TOMBSTONE_PREFIX) for name in os.listdir(store.root))
+
+
+def test_existing_session_directories_and_tombstones_are_loaded(tmp_path, clock):
+    root = tmp_path / "user_files"
+    (root / "alice").mkdir(parents=True)
+    (root / "alice" / "spec.docx").write_bytes(b"12345")
+    (root / f"{TOMBSTONE_PREFIX}bob-1").mkdir()
+
+    store = make_store(tmp_path)
+    assert store.stats()["total_bytes"] == 5
+    assert os.listdir(store.root) == ["alice"]
@@ -0,0 +1,152 @@
+import os
+
+import pytest
+
+# generate_final_timeline builds its OpenAI client at import time
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import generate_final_timeline
+import pipeline_checkpoints
+from generate_final_timeline import refine_timeline_sections
+from pipeline_checkpoints import CheckpointStore
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pipeline_checkpoints.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return CheckpointStore(db_path=str(tmp_path / "checkpoints.db"), ttl_sec=60)
+
+
+class Stage:
+    def __init__(self, output):
+        self.output = output
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.output
+
+
+def test_unfinished_run_resumes_after_its_last_stage(store):
+    generate = Stage("timeline")
+    assert store.begin("doc", "v1") is False
+    store.run("doc", "generate", generate, pipeline="v1")
+
+    # Interrupted before finish(), so the next attempt resumes
+    assert store.begin("doc", "v1") is True
+    assert store.run("doc", "generate", generate, pipeline="v1") == "timeline"
+    assert generate.calls == 1
+
+
+def test_finished_run_starts_fresh(store):
+    generate = Stage("timeline")
+    store.begin("doc", "v1")
+    store.run("doc", "generate", generate, pipeline="v1")
+    store.finish("doc", "v1")
+
+    assert store.begin("doc", "v1") is False
+    assert store.load("doc", "generate", "v1") == (False, None)
+    store.run("doc", "generate", generate, pipeline="v1")
+    assert generate.calls == 2
+
+
+def test_finished_run_is_reused_when_asked(store):
+    generate = Stage("timeline")
+    store.begin("doc", "v1")
+    store.run("doc", "generate", generate, pipeline="v1")
+    store.finish("doc", "v1")
+
+    assert store.begin("doc", "v1", reuse_finished=True) is True
+    assert store.run("doc", "generate", generate, pipeline="v1") == "timeline"
+    assert generate.calls == 1
+
+
+def test_pipeline_versions_are_separate_runs(store):
+    store.begin("doc", "v1")
+    store.run("doc", "generate", Stage("old prompt"), pipeline="v1")
+
+    assert store.begin("doc", "v2") is False
+    assert store.run("doc", "generate", Stage("new prompt"), pipeline="v2") == "new prompt"
+    # Starting v2 leaves the v1 run untouched
+    assert store.load("doc", "generate", "v1") == (True, "old prompt")
+    assert sorted((doc_hash, pipeline) for doc_hash, pipeline, *_ in store.documents()) == [("doc", "v1"), ("doc", "v2")]
+
+
+def test_runs_not_updated_within_the_ttl_are_purged(store, clock):
+    store.begin("old", "v1")
+    store.run("old", "generate", Stage("old timeline"), pipeline="v1")
+    clock.now += 30
+    store.begin("new", "v1")
+    store.run("new", "generate", Stage("new timeline"), pipeline="v1")
+
+    clock.now += 31
+    store.purge()
+    assert store.load("old", "generate", "v1") == (False, None)
+    assert store.load("new", "generate", "v1") == (True, "new timeline")
+    assert [doc_hash for doc_hash, *_ in store.documents()] == ["new"]
+
+
+def test_purge_removes_stages_left_without_a_run(store):
+    store.begin("doc", "v1")
+    store.clear("doc")
+    store.save("doc", "generate", "timeline", 0.1, "v1")
+
+    store.purge()
+    assert store.stages("doc") == []
+
+
+def test_stored_none_output_counts_as_a_checkpoint(store):
+    validate = Stage(None)
+    store.begin("doc", "v1")
+    assert store.run("doc", "validate", validate, pipeline="v1") is None
+
+    assert store.load("doc", "validate", "v1") == (True, None)
+    assert store.run("doc", "validate", validate, pipeline="v1") is None
+    assert validate.calls == 1
+
+
+def test_stage_without_reuse_always_runs(store):
+    durations = Stage("durations")
+    store.begin("doc", "v1")
+    store.run("doc", "durations", durations, pipeline="v1", reuse=False)
+    store.run("doc", "durations", durations, pipeline="v1", reuse=False)
+    assert durations.calls == 2
+
+
+class Section:
+    def __init__(self, page_content):
+        self.page_content = page_content
+
+
+class CountingStore(CheckpointStore):
+    purges = 0
+
+    def purge(self, now=None):
+        self.purges += 1
+        super().purge(now)
+
+
+def test_sectioned_run_purges_once(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(generate_final_timeline, "generate_timeline", lambda chunks:
+                        f"Phase,Task,Subtask,Total Time (Days),Total Time (Hours)\nBuild,{chunks[0]},Work,1,8")
+    monkeypatch.setattr(generate_final_timeline, "validate_timeline", lambda chunks, timeline_text: None)
+    monkeypatch.setattr(generate_final_timeline, "evaluate_durations", lambda timeline_text: timeline_text)
+    store = CountingStore(db_path=str(tmp_path / "checkpoints.db"), ttl_sec=60)
+
+    timeline = refine_timeline_sections([Section("Auth"), Section("Billing"), Section("Reports")], checkpoints=store)
+    assert store.purges == 1
+    assert timeline.splitlines()[1:] == ["Build,Auth,Work,1,8", "Build,Billing,Work,1,8", "Build,Reports,Work,1,8"]
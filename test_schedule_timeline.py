@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+import schedule_timeline
+from schedule_timeline import compute_schedule, schedule_timeline as schedule_df
+
+
+def kahn_schedule(durations, edges):
+    """
+    Plain reference: Kahn's algorithm for the topological order, then forward and backward passes.
+    """
+    n_nodes = len(durations)
+    successors = [[] for _ in range(n_nodes)]
+    indegree = [0] * n_nodes
+    for source, target in edges:
+        successors[source].append(target)
+        indegree[target] += 1
+
+    order = [node for node in range(n_nodes) if indegree[node] == 0]
+    for node in order:
+        for target in successors[node]:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                order.append(target)
+    assert len(order) == n_nodes
+
+    earliest_start = [0.0] * n_nodes
+    for node in order:
+        for target in successors[node]:
+            earliest_start[target] = max(earliest_start[target], earliest_start[node] + durations[node])
+    project_duration = max(start + duration for start, duration in zip(earliest_start, durations))
+
+    latest_finish = [project_duration] * n_nodes
+    for node in reversed(order):
+        for target in successors[node]:
+            latest_finish[node] = min(latest_finish[node], latest_finish[target] - durations[target])
+    slack = [finish - start - duration for start, finish, duration in zip(earliest_start, latest_finish, durations)]
+    return earliest_start, slack, project_duration
+
+
+def random_dag(rng, n_nodes, n_edges):
+    # Edges only go from a lower to a higher node of a random permutation, so the graph is acyclic
+    ranks = rng.permutation(n_nodes)
+    pairs = rng.integers(0, n_nodes, size=(n_edges, 2))
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    forward = ranks[pairs[:, 0]] < ranks[pairs[:, 1]]
+    edges = np.where(forward[:, None], pairs, pairs[:, ::-1])
+    durations = rng.integers(0, 10, size=n_nodes).astype(float)
+    return durations, edges
+
+
+@pytest.mark.parametrize("scalar", [False, True])
+@pytest.mark.parametrize("seed", range(20))
+def test_critical_path_matches_kahn(monkeypatch, seed, scalar):
+    if scalar:
+        # Force the deep-graph fallback for every graph
+        monkeypatch.setattr(schedule_timeline, "NARROW_LEVEL_SIZE", np.inf)
+        monkeypatch.setattr(schedule_timeline, "MAX_NARROW_LEVELS", -1)
+    rng = np.random.default_rng(seed)
+    durations, edges = random_dag(rng, n_nodes=int(rng.integers(1, 60)), n_edges=int(rng.integers(0, 150)))
+
+    schedule = compute_schedule(durations, edges[:, 0], edges[:, 1])
+    earliest_start, slack, project_duration = kahn_schedule(durations.tolist(), edges.tolist())
+
+    np.testing.assert_allclose(schedule["start"], earliest_start)
+    np.testing.assert_allclose(schedule["slack"], slack, atol=1e-9)
+    np.testing.assert_array_equal(schedule["critical"], np.isclose(slack, 0.0))
+    assert schedule["project_duration"] == pytest.approx(project_duration)
+
+
+@pytest.mark.parametrize("team_size", [1, 2, 3])
+@pytest.mark.parametrize("seed", range(10))
+def test_team_schedule_slack_is_consistent(seed, team_size):
+    rng = np.random.default_rng(seed)
+    durations, edges = random_dag(rng, n_nodes=40, n_edges=60)
+    schedule = compute_schedule(durations, edges[:, 0], edges[:, 1], team_size=team_size)
+    start, finish, slack = schedule["start"], schedule["finish"], schedule["slack"]
+
+    for source, target in edges:
+        assert start[target] >= finish[source] - 1e-9
+    busy = durations > 0
+    for moment in np.unique(start[busy]):
+        assert np.sum(busy & (start <= moment) & (finish > moment)) <= team_size
+
+    assert (slack >= -1e-9).all()
+    # The row that ends the project is always on the critical path
+    assert schedule["critical"][np.argmax(finish)]
+    assert schedule["project_duration"] == pytest.approx(finish.max())
+
+
+def test_team_size_reports_slack_of_the_limited_schedule():
+    df = pd.DataFrame({
+        'Phase': ['P1', 'P1', 'P1', 'P2'],
+        'Task': ['A', 'B', 'C', 'D'],
+        'Subtask': ['a', 'b', 'c', 'd'],
+        'Total Time (Days)': [5, 3, 2, 1],
+        'Total Time (Hours)': [40, 24, 16, 8],
+    })
+    scheduled, project_duration = schedule_df(df, start_date="2025-01-06", team_size=1)
+    assert project_duration == 11
+    # With one team member every row is on the path that ends the project
+    assert scheduled['Slack (Days)'].tolist() == [0, 0, 0, 0]
+    assert scheduled['Critical Path'].all()
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError):
+        compute_schedule([1.0, 1.0], [0, 1], [1, 0])
@@ -0,0 +1,88 @@
+import pytest
+
+from timeline_history import TimelineHistory
+
+HEADER = "Phase,Task,Subtask,Total Time (Days),Total Time (Hours)"
+
+
+def timeline(*rows, queries=None):
+    text = "\n".join([HEADER, *rows])
+    if queries:
+        text += "\n\nDeveloper Side Queries:\n" + "\n".join(queries)
+    return text
+
+
+VERSIONS = [
+    timeline("Build,API,Login,2,16", queries=["1. Which auth provider?"]),
+    timeline("Build,API,Login,3,24", queries=["1. Which auth provider?"]),
+    timeline("Build,API,Login,3,24", "Build,API,Logout,1,8"),
+    timeline("Build,API,Logout,1,8"),
+    timeline("Ship,Deploy,Docker image,2,16", "Build,API,Logout,1,8"),
+]
+
+
+def build_history(max_versions):
+    history = TimelineHistory(VERSIONS[0], max_versions=max_versions)
+    for number, text in enumerate(VERSIONS[1:], start=2):
+        assert history.append(text, label=f"Edit {number}") == number
+    return history
+
+
+def test_get_text_returns_every_kept_version():
+    history = build_history(max_versions=10)
+    assert history.versions() == [(1, "Generated")] + [(number, f"Edit {number}") for number in range(2, 6)]
+    for number, text in enumerate(VERSIONS, start=1):
+        assert history.get_text(number) == text
+
+
+@pytest.mark.parametrize("max_versions", [1, 2, 3, 4, 5])
+def test_old_versions_are_folded_into_the_base(max_versions):
+    history = build_history(max_versions=max_versions)
+    kept = [number for number, _ in history.versions()]
+
+    assert kept == list(range(6 - max_versions, 6))
+    assert history.latest_number == 5
+    for number in kept:
+        assert history.get_text(number) == VERSIONS[number - 1]
+    # The oldest kept version takes over the label of the version it was folded into
+    assert history.versions()[0][1] == ("Generated" if max_versions == 5 else f"Edit {kept[0]}")
+    with pytest.raises(KeyError):
+        history.get_text(kept[0] - 1)
+    with pytest.raises(KeyError):
+        history.get_text(6)
+
+
+def test_revert_appends_the_old_version_as_the_newest():
+    history = build_history(max_versions=10)
+    number, text = history.revert(2)
+
+    assert number == 6 == history.latest_number
+    assert text == VERSIONS[1]
+    assert history.get_text(6) == VERSIONS[1]
+    assert history.versions()[-1] == (6, "Reverted to v2")
+    # Earlier versions are unchanged
+    assert history.get_text(5) == VERSIONS[4]
+
+
+def test_revert_respects_max_versions():
+    history = build_history(max_versions=3)
+    history.revert(4)
+    assert [number for number, _ in history.versions()] == [4, 5, 6]
+    assert history.get_text(6) == VERSIONS[3]
+
+
+def test_compare_lists_added_and_removed_rows():
+    history = build_history(max_versions=10)
+    assert history.compare(1, 2) == [
+        {"Change": "Removed", "Phase": "Build", "Task": "API", "Subtask": "Login",
+         "Total Time (Days)": "2", "Total Time (Hours)": "16"},
+        {"Change": "Added", "Phase": "Build", "Task": "API", "Subtask": "Login",
+         "Total Time (Days)": "3", "Total Time (Hours)": "24"},
+    ]
+    assert history.compare(3, 4) == [
+        {"Change": "Removed", "Phase": "Build", "Task": "API", "Subtask": "Login",
+         "Total Time (Days)": "3", "Total Time (Hours)": "24"},
+    ]
+    # Developer side queries are not timeline rows
+    assert [change["Change"] for change in history.compare(2, 3)] == ["Added"]
+    assert history.compare(5, 5) == []
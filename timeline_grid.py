@@ -0,0 +1,100 @@
+import math
+import pandas as pd
+import streamlit as st
+from st_aggrid import AgGrid, GridOptionsBuilder
+
+GRID_PAGE_SIZES = [25, 50, 100, 200]
+TEXT_COLUMNS = ['Phase', 'Task', 'Subtask']
+
+
+def filter_timeline(df, query):
+    """
+    Keeps the rows whose phase, task or subtask contains `query` (case-insensitive).
+    """
+    if not query:
+        return df
+    query = query.lower()
+    mask = pd.Series(False, index=df.index)
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            mask |= df[column].astype(str).str.lower().str.contains(query, regex=False)
+    return df[mask]
+
+
+def sort_timeline(df, column, ascending=True):
+    """
+    Sorts the rows by a column, keeping the original order for ties and when no column is given.
+    """
+    if not column or column not in df.columns:
+        return df
+    return df.sort_values(column, ascending=ascending, kind='stable')
+
+
+def page_of(df, page, page_size):
+    """
+    Returns the rows of a 1-based page.
+    """
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def phase_summary(df):
+    """
+    Collapses the timeline to one row per phase with task and subtask counts and total durations.
+    """
+    summary = df.groupby('Phase', sort=False).agg(
+        **{
+            'Tasks': ('Task', 'nunique'),
+            'Subtasks': ('Subtask', 'count'),
+            'Total Time (Days)': ('Total Time (Days)', 'sum'),
+            'Total Time (Hours)': ('Total Time (Hours)', 'sum'),
+        }
+    )
+    if 'Start Date' in df.columns:
+        dates = df.groupby('Phase', sort=False).agg(**{'Start Date': ('Start Date', 'min'), 'End Date': ('End Date', 'max')})
+        summary = summary.join(dates)
+    return summary.reset_index()
+
+
+def show_grid(df, key):
+    gb = GridOptionsBuilder.from_dataframe(df)
+    # Filtering and sorting are done on the server over the full timeline
+    gb.configure_default_column(resizable=True, filterable=False, sortable=False, editable=False)
+    gb.configure_grid_options(domLayout='normal')  # Adjust height based on content
+    grid_options = gb.build()
+
+    # Display the DataFrame using AgGrid with auto-sizing columns
+    AgGrid(df, gridOptions=grid_options, fit_columns_on_grid_load=True, theme="alpine", key=key)
+
+
+def render_timeline_grid(df, key):
+    """
+    Renders a timeline with server-side filtering, sorting and pagination, or as a phase summary.
+    Only the rows of the current page are sent to the browser.
+
+    Args:
+        df (DataFrame): The full timeline.
+        key (str): Prefix for the widget keys, unique per grid on the page.
+    """
+    view = st.radio("View", ["Rows", "Phase summary"], horizontal=True, key=f"{key}_view", label_visibility="collapsed")
+    if view == "Phase summary":
+        show_grid(phase_summary(df), key=f"{key}_summary")
+        return
+
+    filter_column, sort_column, order_column, size_column, page_column = st.columns([3, 2, 1, 1, 1])
+    query = filter_column.text_input("Filter", key=f"{key}_filter", placeholder="Search phase, task or subtask")
+    sort_by = sort_column.selectbox("Sort by", [None] + list(df.columns), key=f"{key}_sort",
+                                    format_func=lambda column: "Timeline order" if column is None else column)
+    ascending = order_column.radio("Order", ["Asc", "Desc"], key=f"{key}_order") == "Asc"
+    page_size = size_column.selectbox("Rows per page", GRID_PAGE_SIZES, key=f"{key}_page_size")
+
+    rows = sort_timeline(filter_timeline(df, query), sort_by, ascending)
+    page_count = max(1, math.ceil(len(rows) / page_size))
+    # A narrower filter can leave the remembered page past the end
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+    page = page_column.number_input("Page", min_value=1, max_value=page_count, step=1, key=page_key)
+
+    show_grid(page_of(rows, page, page_size), key=f"{key}_rows")
+    st.caption(f"Page {page} of {page_count} | {len(rows)} of {len(df)} rows")
@@ -0,0 +1,125 @@
+import csv
+import os
+from difflib import SequenceMatcher
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TIMELINE_HISTORY_MAX_VERSIONS = int(os.getenv("TIMELINE_HISTORY_MAX_VERSIONS") or 20)
+
+
+def _diff_lines(old_lines, new_lines):
+    """
+    Computes a row-level delta turning `old_lines` into `new_lines`.
+
+    Returns:
+        list: (start, end, replacement_lines) for every changed range of `old_lines`.
+    """
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        (i1, i2, new_lines[j1:j2])
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _apply_delta(lines, delta):
+    lines = list(lines)
+    # Ranges refer to the old lines, so apply them from the end backwards
+    for start, end, replacement in reversed(delta):
+        lines[start:end] = replacement
+    return lines
+
+
+class TimelineHistory:
+    """
+    Version history of a session's timeline.
+
+    The oldest kept version is stored in full and every later version as a row-level delta
+    against the previous one. Only the latest `max_versions` versions are kept; older deltas
+    are folded into the base snapshot.
+    """
+
+    def __init__(self, timeline_text, label="Generated", max_versions=TIMELINE_HISTORY_MAX_VERSIONS):
+        self.max_versions = max(1, max_versions)
+        self._base_lines = timeline_text.split("\n")
+        self._base_number = 1
+        self._base_label = label
+        self._deltas = []  # (label, delta) for versions after the base
+        self._latest_lines = self._base_lines
+
+    @property
+    def latest_number(self):
+        return self._base_number + len(self._deltas)
+
+    def versions(self):
+        """
+        Returns the kept versions as (number, label) pairs, oldest first.
+        """
+        labels = [self._base_label] + [label for label, _ in self._deltas]
+        return [(self._base_number + idx, label) for idx, label in enumerate(labels)]
+
+    def append(self, timeline_text, label):
+        """
+        Records a new version of the timeline.
+
+        Returns:
+            int: The number of the new version.
+        """
+        new_lines = timeline_text.split("\n")
+        self._deltas.append((label, _diff_lines(self._latest_lines, new_lines)))
+        self._latest_lines = new_lines
+
+        while len(self._deltas) >= self.max_versions:
+            self._base_label, delta = self._deltas.pop(0)
+            self._base_lines = _apply_delta(self._base_lines, delta)
+            self._base_number += 1
+        return self.latest_number
+
+    def revert(self, number):
+        """
+        Makes an earlier version current again by recording it as a new version.
+        Only the history changes; the version's exports are built when they are downloaded.
+
+        Returns:
+            tuple: The number of the new version and its timeline text.
+        """
+        timeline_text = self.get_text(number)
+        return self.append(timeline_text, label=f"Reverted to v{number}"), timeline_text
+
+    def get_lines(self, number):
+        if not self._base_number <= number <= self.latest_number:
+            raise KeyError(f"Version {number} is not in the history")
+        if number == self.latest_number:
+            return list(self._latest_lines)
+        lines = self._base_lines
+        for _, delta in self._deltas[:number - self._base_number]:
+            lines = _apply_delta(lines, delta)
+        return lines
+
+    def get_text(self, number):
+        """
+        Rebuilds the full timeline text of a version.
+        """
+        return "\n".join(self.get_lines(number))
+
+    def compare(self, old_number, new_number):
+        """
+        Lists the timeline rows that differ between two versions.
+
+        Returns:
+            list: Dicts with a 'Change' key ('Added' or 'Removed') and the row's timeline columns.
+        """
+        old_rows = self.get_text(old_number).split("\n\n")[0].split("\n")
+        new_rows = self.get_text(new_number).split("\n\n")[0].split("\n")
+        header = [column.strip() for column in next(csv.reader([new_rows[0]]))] if new_rows else []
+
+        changes = []
+        for start, end, replacement in _diff_lines(old_rows[1:], new_rows[1:]):
+            for status, lines in (("Removed", old_rows[1:][start:end]), ("Added", replacement)):
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    cells = [cell.strip() for cell in next(csv.reader([line]))]
+                    changes.append({"Change": status, **dict(zip(header, cells))})
+        return changes